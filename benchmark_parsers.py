@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak RSS is then left out
+    resource = None
+
+from data.BenchmarkFile import MappedBenchmarkFile, is_compressed
+from data.VersionAndClasses import schemas
+from file_generator import generate_log
+from file_opener import open_file, iter_file
+
+# Decoding paths measured for every file, each one in a fresh process
+PATHS = ["records", "columnar", "iter", "mmap"]
+# A single run jitters by well over 10%, regressions are only judged on the best and median of several
+REGRESSION_THRESHOLD = 0.20
+MIN_BASELINE_REPEATS = 3
+
+
+def format_cases():
+    """Every (version, subversion, subsubversion) a benchmark file can have."""
+    cases = []
+    for version, schema in sorted(schemas.items()):
+        if isinstance(schema.target, dict):
+            cases.extend((version, subversion, None) for subversion in sorted(schema.target))
+        elif schema.header_bytes == 2:
+            cases.extend((version, a, b) for a, b in itertools.product((1, 2, 3), repeat=2))
+        else:
+            cases.append((version, None, None))
+    return cases
+
+
+def case_name(version, subversion, subsubversion):
+    return ".".join(str(part) for part in (version, subversion, subsubversion) if part is not None)
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def decode(filename, path):
+    """Decode filename through path, return the record count and the time its first record was available."""
+    start = time.perf_counter()
+    # stats=False: no .stats.json next to the inputs, and the first repeat is not slowed by it
+    if path == "records":
+        result = open_file(filename, stats=False)
+        return len(result), time.perf_counter() - start
+    if path == "columnar":
+        result = open_file(filename, columnar=True, cache=None, stats=False)
+        return len(result), time.perf_counter() - start
+    if path == "iter":
+        count = 0
+        first = None
+        for block in iter_file(filename):
+            if first is None:
+                first = time.perf_counter() - start
+            count += len(block["robot_dt"])
+        return count, first
+    if path == "mmap":
+        mapped = MappedBenchmarkFile(filename)
+        first = None
+        if len(mapped):
+            mapped.record(0)
+            first = time.perf_counter() - start
+        mapped.columns()
+        return len(mapped), first
+    raise ValueError(f"Unknown decoding path {path}")
+
+
+def measure(filename, path, repeats):
+    """Worker: best and median of repeats decodes of filename, run in its own process so peak RSS is its own."""
+    rss_before = peak_rss()
+    best = None
+    times = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            count, first = decode(filename, path)
+            elapsed = time.perf_counter() - start
+            times.append(elapsed)
+            if best is None or elapsed < best[0]:
+                best = (elapsed, first, count)
+    elapsed, first, count = best
+    median = statistics.median(times)
+    rss_after = peak_rss()
+    size = os.path.getsize(filename)
+    return {
+        "records": count,
+        "bytes": size,
+        "repeats": repeats,
+        "seconds": elapsed,
+        "median_seconds": median,
+        "records_per_s": count / elapsed if elapsed else None,
+        "median_records_per_s": count / median if median else None,
+        "mb_per_s": size / 1e6 / elapsed if elapsed else None,
+        "time_to_first_record": first,
+        "peak_rss": rss_after,
+        "peak_rss_increase": None if rss_after is None else rss_after - rss_before,
+    }
+
+
+def run(files, paths=PATHS, repeats=3):
+    """Measure every path on every file, files maps a case name to a filename."""
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name, filename in files.items():
+        results[name] = {}
+        for path in paths:
+            if path == "mmap" and is_compressed(filename):
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[name][path] = executor.submit(measure, filename, path, repeats).result()
+            result = results[name][path]
+            print(f"{name:>10} {path:>8}: {result['records_per_s'] or 0:12.0f} records/s "
+                  f"{result['mb_per_s'] or 0:8.1f} MB/s first record {result['time_to_first_record'] or 0:.4f}s "
+                  f"peak RSS {(result['peak_rss'] or 0) / 1e6:.0f} MB (+{(result['peak_rss_increase'] or 0) / 1e6:.0f} MB)")
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """(case, path, ratio) of every measurement whose records/s dropped more than threshold.
+
+    Both the best and the median records/s have to drop, ratio is the one of the medians.
+    Measurements of fewer than MIN_BASELINE_REPEATS repeats on either side are too noisy and skipped,
+    baselines written before repeats and medians were kept are compared on the best records/s alone.
+    """
+    regressions = []
+    for name, paths in results.items():
+        for path, result in paths.items():
+            reference = baseline.get(name, {}).get(path)
+            if not reference or not reference.get("records_per_s") or not result["records_per_s"]:
+                continue
+            if min(reference.get("repeats", MIN_BASELINE_REPEATS), result["repeats"]) < MIN_BASELINE_REPEATS:
+                continue
+            best = result["records_per_s"] / reference["records_per_s"]
+            median = best
+            if reference.get("median_records_per_s") and result.get("median_records_per_s"):
+                median = result["median_records_per_s"] / reference["median_records_per_s"]
+            if max(best, median) < 1 - threshold:
+                regressions.append((name, path, median))
+    return regressions
+
+
+def generate_files(directory, records, seed=0):
+    files = {}
+    for version, subversion, subsubversion in format_cases():
+        name = case_name(version, subversion, subsubversion)
+        files[name] = os.path.join(directory, f"benchmark_{name}.bin")
+        generate_log(files[name], version, records, subversion, subsubversion, seed=seed)
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure decoding throughput of every benchmark format")
+    parser.add_argument("files", nargs="*", help="files to measure instead of generated ones")
+    parser.add_argument("--records", type=int, default=100_000, help="records per generated file")
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS)
+    parser.add_argument("--repeats", type=int, default=MIN_BASELINE_REPEATS)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative records/s drop reported as a regression")
+    args = parser.parse_args()
+    if args.baseline and args.repeats < MIN_BASELINE_REPEATS:
+        parser.error(f"--baseline needs --repeats of at least {MIN_BASELINE_REPEATS}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.files:
+            files = {os.path.basename(filename): filename for filename in args.files}
+        else:
+            files = generate_files(directory, args.records)
+        results = run(files, args.paths, args.repeats)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "processor": platform.processor(),
+        "records": None if args.files else args.records,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for name, path, ratio in regressions:
+            print(f"REGRESSION {name} {path}: {ratio:.2f}x the baseline median records/s")
+        if regressions:
+            sys.exit(1)
+        print("No regression")
@@ -0,0 +1,153 @@
+import numpy as np
+
+from data.BenchmarkFile import MappedBenchmarkFile, read_header, read_frame, record_dtype, open_binary, \
+    is_compressed
+from data.BenchmarkFrame import BenchmarkFrame
+from data.Parser import CustomParser, CompleteParser
+
+
+def record_class(class_type):
+    if isinstance(class_type, CompleteParser):
+        return type(class_type.data_type)
+    return class_type.dataclass_type
+
+
+class BenchmarkRun:
+    """One file of a BenchmarkDataset, its columns are decoded on first access only.
+
+    With a cache the whole file is decoded once and stored, later opens memory map just the
+    columns that are read. Without one, a plain .bin is memory mapped and each column is
+    decoded on its own, a compressed file is decoded whole.
+    """
+    def __init__(self, filename, index, cache=None):
+        self.filename = filename
+        self.index = index
+        self.cache = cache
+        with open_binary(filename) as f:
+            self.header = read_header(f)
+        self.names = list(record_dtype(self.header.class_type).names)
+        if "dt" not in self.names:
+            self.names.append("dt")
+        self.optional = []
+        if isinstance(self.header.class_type, CustomParser):
+            self.optional = [name for name in self.header.class_type.ALL_FIELDS if name not in self.names]
+        self._columns = {}
+        self._mapped = None
+
+    def __len__(self):
+        return len(self.column("robot_dt"))
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name in ("names", "optional"):
+            raise AttributeError(name)
+        if name in self.names or name in self.optional:
+            return self.column(name)
+        raise AttributeError(f"{type(self).__name__} has no column {name!r}")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.index}, {self.filename!r})"
+
+    def loaded(self):
+        return list(self._columns)
+
+    def column(self, name) -> np.ndarray:
+        if name in self.optional:
+            return None
+        if name not in self._columns:
+            self._load(name)
+        return self._columns[name]
+
+    def frame(self) -> BenchmarkFrame:
+        return BenchmarkFrame({name: self.column(name) for name in self.names}, self.optional, self.header.class_type)
+
+    def _load(self, name):
+        if self.cache is not None:
+            frame = self.cache.load(self.filename, self.header.class_type)
+            if frame is None:
+                frame = self._decode()
+                try:
+                    self.cache.store(self.filename, frame)
+                except OSError as e:
+                    print(f"Could not cache {self.filename}: {e}")
+            self._columns.update(frame.columns)
+        elif is_compressed(self.filename):
+            self._columns.update(self._decode().columns)
+        else:
+            if self._mapped is None:
+                self._mapped = MappedBenchmarkFile(self.filename)
+            if name == "dt":
+                self._columns["dt"] = self._time_base()
+            else:
+                self._columns[name] = self._mapped.column(name)
+        if name not in self._columns:
+            raise KeyError(f"{self.filename} has no column {name!r}")
+
+    def _decode(self) -> BenchmarkFrame:
+        with open_binary(self.filename) as f:
+            return read_frame(f, read_header(f))
+
+    def _time_base(self):
+        # Same rule as TimeBase: dt is rebuilt from robot_dt when it is not logged or all zero
+        class_type = self.header.class_type
+        if "dt" in self._mapped.dtype.names and not getattr(class_type, "needs_dt_accumulation", False):
+            dt = self._mapped.column("dt")
+            if dt.any():
+                return dt
+        return np.cumsum(self.column("robot_dt"))
+
+
+class BenchmarkDataset:
+    """Virtual dataset over benchmark files sharing one record class.
+
+    Only the headers are read up front. Runs and their columns are loaded the first time a
+    query needs them, so a query over one column of a few runs never decodes the rest.
+    """
+    def __init__(self, filenames, cache=None):
+        self.runs = [BenchmarkRun(filename, i, cache) for i, filename in enumerate(filenames)]
+        if not self.runs:
+            raise ValueError("A dataset needs at least one file")
+        first = self.runs[0]
+        for run in self.runs[1:]:
+            if record_class(run.header.class_type) is not record_class(first.header.class_type):
+                raise ValueError(f"{run.filename} does not share the record class of {first.filename}")
+        # Controller trees or logged fields can differ between runs, only shared columns are queried together
+        self.names = [name for name in first.names if all(name in run.names for run in self.runs)]
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __getitem__(self, i) -> BenchmarkRun:
+        return self.runs[i]
+
+    def __iter__(self):
+        return iter(self.runs)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} runs, columns={self.names})"
+
+    def select(self, runs=None) -> list[BenchmarkRun]:
+        if runs is None:
+            return self.runs
+        return [self.runs[i] for i in runs]
+
+    def columns(self, name, runs=None) -> list[np.ndarray]:
+        """name of every selected run, one array per run."""
+        return [run.column(name) for run in self.select(runs)]
+
+    def time_offsets(self, runs=None, sequential=False) -> list[float]:
+        """Offset added to the dt of each run: 0 to overlay them, the end of the previous ones to chain them."""
+        selected = self.select(runs)
+        if not sequential or not selected:
+            return [0.0] * len(selected)
+        ends = [float(run.column("dt")[-1]) if len(run) else 0.0 for run in selected]
+        return [0.0] + [float(end) for end in np.cumsum(ends[:-1])]
+
+    def concat(self, names=None, runs=None, sequential=False) -> BenchmarkFrame:
+        """Selected runs one after the other, with a run id column and a time column offset per run."""
+        selected = self.select(runs)
+        names = names or self.names
+        offsets = self.time_offsets(runs, sequential)
+        columns = {name: np.concatenate([run.column(name) for run in selected]) for name in names}
+        columns["run"] = np.concatenate([np.full(len(run), run.index) for run in selected])
+        columns["time"] = np.concatenate([run.column("dt") + offset for run, offset in zip(selected, offsets)])
+        return BenchmarkFrame(columns, self.runs[0].optional, self.runs[0].header.class_type)
@@ -0,0 +1,317 @@
+import bz2
+import dataclasses
+import glob
+import gzip
+import lzma
+import os
+import struct
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+from data.BenchmarkFrame import BenchmarkFrame
+from data.Parser import CustomParser, CompleteParser, read_values, records_to_columns
+from data.VersionAndClasses import schemas, compile_decoder, read_parsable_layout
+
+version_with_subversion = [version for version, schema in schemas.items() if schema.header_bytes >= 1]
+version_with_subsubversion = [version for version, schema in schemas.items() if schema.header_bytes >= 2]
+
+# Compressed logs are decompressed on the fly, their readers are buffered so read(n) is exact
+compressed_openers = {
+    ".gz": gzip.open,
+    ".xz": lzma.open,
+    ".bz2": bz2.open,
+}
+# Records decoded at once from a compressed body, it is not read whole before decoding
+COMPRESSED_BLOCK_RECORDS = 65536
+
+
+def is_compressed(filename) -> bool:
+    return os.path.splitext(filename)[1].lower() in compressed_openers
+
+
+def body_block_records(f) -> Optional[int]:
+    """block_records of read_values for f, None reads a plain file in one go."""
+    if isinstance(f, (gzip.GzipFile, lzma.LZMAFile, bz2.BZ2File)):
+        return COMPRESSED_BLOCK_RECORDS
+    return None
+
+
+def open_binary(filename, mode="rb"):
+    """Open a benchmark file, .bin.gz, .bin.xz and .bin.bz2 are (de)compressed on the fly."""
+    opener = compressed_openers.get(os.path.splitext(filename)[1].lower(), open)
+    return opener(filename, mode)
+
+
+def find_logs(directory) -> list[str]:
+    """Every benchmark file of directory, compressed ones included, sorted by name."""
+    patterns = ["*.bin"] + [f"*.bin{extension}" for extension in compressed_openers]
+    return sorted(filename for pattern in patterns for filename in glob.glob(os.path.join(directory, pattern)))
+
+
+def log_stem(filename) -> str:
+    """filename without its compression and .bin extensions, used to name output directories."""
+    if is_compressed(filename):
+        filename = os.path.splitext(filename)[0]
+    stem, extension = os.path.splitext(filename)
+    return stem if extension == ".bin" else filename
+
+
+@dataclasses.dataclass
+class BenchmarkHeader:
+    version: int
+    subversion: Optional[int] = None
+    subsubversion: Optional[int] = None
+    class_type: Any = None
+
+
+def read_header(f) -> BenchmarkHeader:
+    """Read the version bytes of a benchmark file and resolve the parser of its records.
+
+    For ParsableClass formats the controller type bytes are consumed too, so f is left
+    at the first record in every case.
+    """
+    data = f.read(8)
+    if len(data) != 8:
+        raise ValueError("Version of Benchmark not found")
+    header = BenchmarkHeader(struct.unpack('>Q', data)[0])
+    schema = schemas.get(header.version)
+    if schema is None:
+        raise ValueError(f"Unknown benchmark version {header.version}")
+    if schema.header_bytes >= 1:
+        data = f.read(1)
+        if len(data) != 1:
+            raise ValueError("Subversion of Benchmark not found")
+        header.subversion = struct.unpack('>B', data)[0]
+    if schema.header_bytes >= 2:
+        data = f.read(1)
+        if len(data) != 1:
+            raise ValueError("Subsubversion of Benchmark not found")
+        header.subsubversion = struct.unpack('>B', data)[0]
+    if schema.is_parsable():
+        layout = read_parsable_layout(f, header.version)
+        header.class_type = CompleteParser(f, layout.template, layout, body_block_records(f))
+    else:
+        header.class_type = compile_decoder(header.version, header.subversion, header.subsubversion)
+    return header
+
+
+def read_columns(f, header: BenchmarkHeader):
+    """Bulk decode the remaining body of f into one float64 array per field."""
+    dtype = record_dtype(header.class_type)
+    values, _ = read_values(f, dtype, body_block_records(f))
+    return dict(zip(dtype.names, values))
+
+
+def read_frame(f, header: BenchmarkHeader) -> BenchmarkFrame:
+    """Bulk decode the remaining body of f into a BenchmarkFrame with its time base."""
+    class_type = header.class_type
+    if isinstance(class_type, CompleteParser):
+        # Share the decoded values with the records used by display_data
+        records = class_type.get_result()
+        columns = {path: records.column(path) for path in class_type.layout.paths}
+        return BenchmarkFrame(TimeBase(class_type).apply(columns), (), class_type)
+    return frame_of_columns(read_columns(f, header), class_type)
+
+
+def frame_of_columns(columns, class_type) -> BenchmarkFrame:
+    """BenchmarkFrame of the decoded columns of a legacy or CustomParser body, with its time base."""
+    optional = ()
+    if isinstance(class_type, CustomParser):
+        optional = [name for name in class_type.ALL_FIELDS if name not in columns]
+    return BenchmarkFrame(TimeBase(class_type).apply(columns), optional, class_type)
+
+
+def record_dtype(class_type) -> np.dtype:
+    """Big-endian structured dtype of one record of the given parser."""
+    if isinstance(class_type, CompleteParser):
+        return class_type.layout.dtype
+    return class_type.dtype
+
+
+def needs_dt_accumulation(class_type, columns) -> bool:
+    """Whether dt has to be rebuilt from robot_dt, as open_file does when it is missing or all zero."""
+    if getattr(class_type, "needs_dt_accumulation", False):
+        return True
+    dt = columns.get("dt")
+    return dt is None or not dt.any()
+
+
+class TimeBase:
+    """Running dt accumulation over consecutive column blocks of one file.
+
+    Whether accumulation applies is decided on the first non-empty block, the running total
+    is then carried over so blocks get the same dt as a whole-file decode.
+    """
+    def __init__(self, class_type):
+        self.class_type = class_type
+        self.accumulate = None
+        self.offset = 0.0
+
+    def apply(self, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        if not columns:
+            return columns
+        if len(columns["robot_dt"]) == 0:
+            # Same keys as a non-empty block, dt is always there once applied
+            columns.setdefault("dt", np.empty(0))
+            return columns
+        if self.accumulate is None:
+            self.accumulate = needs_dt_accumulation(self.class_type, columns)
+        if self.accumulate:
+            robot_dt = columns["robot_dt"].copy()
+            robot_dt[0] += self.offset
+            if "dt" in columns:
+                np.cumsum(robot_dt, out=columns["dt"])
+            else:
+                columns["dt"] = np.cumsum(robot_dt)
+            self.offset = columns["dt"][-1]
+        return columns
+
+
+def iter_columns(f, header: BenchmarkHeader, chunk_records=65536):
+    """Yield the remaining records of f as column blocks of at most chunk_records records."""
+    dtype = record_dtype(header.class_type)
+    time_base = TimeBase(header.class_type)
+    while data := f.read(chunk_records * dtype.itemsize):
+        count = len(data) // dtype.itemsize
+        if count == 0:
+            break
+        yield time_base.apply(records_to_columns(np.frombuffer(data, dtype=dtype, count=count)))
+
+
+class MappedBenchmarkFile:
+    """Random access to the records of a benchmark file without reading it.
+
+    Only the header is parsed, the body is exposed as a read-only np.memmap of records so
+    indexing and slicing are O(1) and only the touched pages are loaded. Compressed files
+    cannot be mapped, iter_columns streams them instead.
+    """
+    def __init__(self, filename):
+        if is_compressed(filename):
+            raise ValueError(f"Cannot memory map compressed file {filename}")
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self.header = read_header(f)
+            self.offset = f.tell()
+        self.dtype = record_dtype(self.header.class_type)
+        self.stride = self.dtype.itemsize
+        count = (os.path.getsize(filename) - self.offset) // self.stride
+        if count > 0:
+            self.records = np.memmap(filename, dtype=self.dtype, mode='r', offset=self.offset, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        return self.records[i]
+
+    def record(self, i):
+        """Record i decoded into the dataclass open_file would give."""
+        class_type = self.header.class_type
+        if isinstance(class_type, CompleteParser):
+            return class_type.layout.build(self.records[i].tolist())
+        return class_type.from_bytes(self.records[i].tobytes())
+
+    def columns(self, start=None, stop=None) -> dict[str, np.ndarray]:
+        return records_to_columns(self.records[start:stop])
+
+    def column(self, name, start=None, stop=None) -> np.ndarray:
+        return self.records[name][start:stop].astype(np.float64)
+
+    def time_base(self) -> np.ndarray:
+        """dt of every record as a whole-file decode gives it, cumulative so it can be binary searched."""
+        columns = {name: self.column(name) for name in ("dt", "robot_dt") if name in self.dtype.names}
+        return TimeBase(self.header.class_type).apply(columns).get("dt", np.empty(0))
+
+    def window(self, start, stop, times=None) -> BenchmarkFrame:
+        """Records start:stop only, with dt taken from times (the time_base) when given."""
+        columns = self.columns(start, stop)
+        if times is not None:
+            columns["dt"] = times[start:stop]
+        optional = ()
+        if isinstance(self.header.class_type, CustomParser):
+            optional = [name for name in self.header.class_type.ALL_FIELDS if name not in columns]
+        return BenchmarkFrame(columns, optional, self.header.class_type)
+
+
+class BenchmarkFollower:
+    """Incremental decoder for a benchmark file that is still being written.
+
+    The header and record layout are resolved once, then every poll() only reads the
+    complete records appended since the previous one. A trailing partial record is left
+    in the file until it is complete.
+    """
+    def __init__(self, filename):
+        if is_compressed(filename):
+            raise ValueError(f"Cannot follow compressed file {filename}")
+        self.filename = filename
+        self.f = open(filename, "rb")
+        self.header = None
+        self.dtype = None
+        self.stride = None
+        self.time_base = None
+        self.position = 0
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def _try_read_header(self):
+        size = os.fstat(self.f.fileno()).st_size
+        self.f.seek(0)
+        try:
+            header = read_header(self.f)
+        except (ValueError, struct.error):
+            # Only a header cut by the end of the file means "not written yet"
+            if self.f.tell() >= size:
+                return False
+            raise
+        self.header = header
+        self.position = self.f.tell()
+        self.dtype = record_dtype(header.class_type)
+        self.stride = self.dtype.itemsize
+        self.time_base = TimeBase(header.class_type)
+        return True
+
+    def poll(self) -> Optional[dict[str, np.ndarray]]:
+        """Decode the records appended since the last poll.
+
+        Columns are empty arrays when nothing was appended, None is returned while the header is
+        incomplete since the columns of the file are not known yet.
+        """
+        if self.header is None and not self._try_read_header():
+            return None
+        count = (os.fstat(self.f.fileno()).st_size - self.position) // self.stride
+        self.f.seek(self.position)
+        data = self.f.read(count * self.stride)
+        count = len(data) // self.stride
+        self.position += count * self.stride
+        self.count += count
+        return self.time_base.apply(records_to_columns(np.frombuffer(data, dtype=self.dtype, count=count)))
+
+
+def follow(filename, interval=0.01, timeout=None):
+    """Yield column blocks of new records as they are appended to filename.
+
+    Stops once the file did not grow for timeout seconds, or never if timeout is None.
+    """
+    with BenchmarkFollower(filename) as follower:
+        last_update = time.monotonic()
+        while True:
+            columns = follower.poll()
+            if columns is not None and len(columns["dt"]):
+                last_update = time.monotonic()
+                yield columns
+            elif timeout is not None and time.monotonic() - last_update > timeout:
+                return
+            else:
+                time.sleep(interval)
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class BenchmarkFrame:
+    """Columnar result of a benchmark file: one contiguous float64 array per field.
+
+    Columns are reachable as attributes (frame.robot_dt) or by name (frame["controller.up"]),
+    nested controller fields also through their prefix (frame.controller.up). Slices, boolean
+    masks and index arrays give a new frame, an integer gives a BenchmarkRow so code written
+    against lists of dataclasses keeps working. Fields the format declares but did not log
+    read as None, like the dataclass defaults.
+    """
+    def __init__(self, columns: dict[str, np.ndarray], optional=(), class_type=None):
+        self.columns = columns
+        self.optional = frozenset(optional)
+        self.class_type = class_type
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns")
+        if columns is None:
+            raise AttributeError(name)
+        if name in columns:
+            return columns[name]
+        prefix = name + "."
+        nested = {path[len(prefix):]: column for path, column in columns.items() if path.startswith(prefix)}
+        if nested:
+            return BenchmarkFrame(nested)
+        if name in self.optional:
+            return None
+        raise AttributeError(f"{type(self).__name__} has no column {name!r}")
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("record index out of range")
+            return BenchmarkRow(self, int(key))
+        return BenchmarkFrame({name: column[key] for name, column in self.columns.items()}, self.optional,
+                              self.class_type)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield BenchmarkRow(self, i)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} records, columns={list(self.columns)})"
+
+    def keys(self):
+        return self.columns.keys()
+
+
+class BenchmarkRow:
+    """Single record of a BenchmarkFrame, its values are read from the columns on access."""
+    __slots__ = ("frame", "index")
+
+    def __init__(self, frame: BenchmarkFrame, index: int):
+        self.frame = frame
+        self.index = index
+
+    def __getattr__(self, name):
+        value = getattr(self.frame, name)
+        if value is None:
+            return None
+        if isinstance(value, BenchmarkFrame):
+            return BenchmarkRow(value, self.index)
+        return float(value[self.index])
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={column[self.index]}" for name, column in self.frame.columns.items())
+        return f"{type(self).__name__}({values})"
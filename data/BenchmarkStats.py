@@ -0,0 +1,137 @@
+import json
+import os
+
+import numpy as np
+
+from data.BenchmarkFile import read_header, iter_columns, open_binary, log_stem
+
+STATS_SUFFIX = ".stats.json"
+
+
+def stats_path(filename) -> str:
+    """Sidecar of filename: data/Run.bin(.gz) -> data/Run.stats.json."""
+    return log_stem(filename) + STATS_SUFFIX
+
+
+def tracking_pairs(names) -> dict[str, tuple[str, str]]:
+    """(target, position) column pairs, named by the position they track."""
+    pairs = {}
+    for name in names:
+        if "target" in name:
+            position = name.replace("target", "position")
+            if position in names:
+                pairs[position] = (name, position)
+    return pairs
+
+
+class RunningStats:
+    """Summary statistics and tracking error integrals over consecutive column blocks.
+
+    Each block is reduced with whole-array operations, only a few scalars per column are
+    kept in between, so a log of any size is summarised in one streaming pass.
+    """
+    def __init__(self):
+        self.count = 0
+        self.columns = {}
+        self.tracking = {}
+        self.duration = 0.0
+
+    def update(self, columns: dict[str, np.ndarray]):
+        if not columns or len(columns["robot_dt"]) == 0:
+            return
+        # Some logs hold corrupted records with huge values, their statistics just become inf/nan
+        with np.errstate(over="ignore", invalid="ignore"):
+            self._update(columns)
+
+    def _update(self, columns):
+        count = len(columns["robot_dt"])
+        total = self.count + count
+        for name, values in columns.items():
+            stats = self.columns.setdefault(name, {
+                "first": float(values[0]), "last": 0.0, "min": np.inf, "max": -np.inf, "mean": 0.0, "m2": 0.0,
+            })
+            stats["last"] = float(values[-1])
+            stats["min"] = min(stats["min"], float(np.fmin.reduce(values)))
+            stats["max"] = max(stats["max"], float(np.fmax.reduce(values)))
+            # Mean and squared deviations of the block merged with the previous ones (Chan et al.)
+            mean = float(np.mean(values))
+            delta = mean - stats["mean"]
+            stats["m2"] += float(np.sum((values - mean) ** 2)) + delta * delta * self.count * count / total
+            stats["mean"] += delta * count / total
+        robot_dt = columns["robot_dt"]
+        t = columns["dt"]
+        for name, (target, position) in tracking_pairs(columns).items():
+            error = np.abs(columns[target] - columns[position])
+            stats = self.tracking.setdefault(name, {"max_abs_error": 0.0, "iae": 0.0, "ise": 0.0, "itae": 0.0})
+            stats["max_abs_error"] = max(stats["max_abs_error"], float(np.fmax.reduce(error)))
+            stats["iae"] += float(np.dot(error, robot_dt))
+            stats["ise"] += float(np.dot(error * error, robot_dt))
+            stats["itae"] += float(np.dot(t * error, robot_dt))
+        self.duration = float(t[-1])
+        self.count = total
+
+    def result(self) -> dict:
+        columns = {}
+        for name, stats in self.columns.items():
+            columns[name] = {
+                "first": stats["first"],
+                "last": stats["last"],
+                "min": stats["min"],
+                "max": stats["max"],
+                "mean": stats["mean"],
+                "std": float(np.sqrt(stats["m2"] / self.count)),
+            }
+        return {"records": self.count, "duration": self.duration, "columns": columns, "tracking": self.tracking}
+
+
+def compute_stats(filename, chunk_records=65536) -> dict:
+    """Stream filename once and return its statistics."""
+    running = RunningStats()
+    with open_binary(filename) as f:
+        header = read_header(f)
+        for block in iter_columns(f, header, chunk_records):
+            running.update(block)
+    return running.result()
+
+
+def write_stats(filename, stats):
+    stat = os.stat(filename)
+    sidecar = {"source": os.path.basename(filename), "size": stat.st_size, "mtime": stat.st_mtime, **stats}
+    tmp = f"{stats_path(filename)}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(sidecar, f, indent=1)
+    os.replace(tmp, stats_path(filename))
+    return sidecar
+
+
+def read_stats(filename):
+    """Sidecar of filename, None when it is missing or older than the file."""
+    try:
+        with open(stats_path(filename)) as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(filename)
+    if sidecar.get("size") != stat.st_size or sidecar.get("mtime") != stat.st_mtime:
+        return None
+    return sidecar
+
+
+def load_stats(filename) -> dict:
+    """Statistics of filename from its sidecar, computed and written first if needed."""
+    sidecar = read_stats(filename)
+    if sidecar is None:
+        sidecar = write_stats(filename, compute_stats(filename))
+    return sidecar
+
+
+def ingest_stats(filename, frame):
+    """Write the sidecar of filename from an already decoded frame, if it is not up to date."""
+    if read_stats(filename) is not None:
+        return
+    running = RunningStats()
+    running.update(dict(frame.columns))
+    try:
+        write_stats(filename, running.result())
+    except OSError as e:
+        print(f"Could not write statistics of {filename}: {e}")
@@ -0,0 +1,93 @@
+import dataclasses
+import struct
+
+import numpy as np
+
+from data.BenchmarkFile import open_binary
+from data.Controllers import Controller, controller_types
+from data.Parser import ParsableClass, get_field_by_path, is_field_subclass_of
+from data.SubControllers import SubController, sub_controller_types
+from data.VersionAndClasses import schemas, compile_decoder
+
+
+def controller_type_bytes(obj) -> bytes:
+    """Controller type bytes of a ParsableClass tree, in the order generate reads them."""
+    data = b""
+    for field in dataclasses.fields(obj):
+        if not is_field_subclass_of(field.type, ParsableClass):
+            continue
+        value = getattr(obj, field.name)
+        # The declared type of the field picks the registry its generate reads from
+        if is_field_subclass_of(field.type, Controller):
+            registry = controller_types
+        elif is_field_subclass_of(field.type, SubController):
+            registry = sub_controller_types
+        else:
+            raise ValueError(f"No controller registry for field {field.name}")
+        if type(value) not in registry:
+            raise ValueError(f"Field {field.name} is not a generated controller: {value!r}")
+        data += struct.pack('>B', registry.index(type(value)))
+        data += controller_type_bytes(value)
+    return data
+
+
+def encode_header(version, subversion=None, subsubversion=None, template=None) -> bytes:
+    """Bytes read_header consumes for this header, template is the controller tree of ParsableClass formats."""
+    schema = schemas.get(version)
+    if schema is None:
+        raise ValueError(f"Unknown benchmark version {version}")
+    data = struct.pack('>Q', version)
+    if schema.header_bytes >= 1:
+        data += struct.pack('>B', subversion)
+    if schema.header_bytes >= 2:
+        data += struct.pack('>B', subsubversion)
+    if schema.is_parsable():
+        if not isinstance(template, schema.target):
+            raise ValueError(f"Version {version} needs a {schema.target.__name__} controller tree")
+        data += controller_type_bytes(template)
+    return data
+
+
+class BenchmarkWriter:
+    """Encoder of benchmark files, the inverse of read_header and of the record decoders.
+
+    The header is written when the writer is created, records are then appended one by one
+    with write_record or in bulk with write_columns. A .gz, .xz or .bz2 filename is compressed.
+    """
+    def __init__(self, filename, version, subversion=None, subsubversion=None, template=None):
+        header = encode_header(version, subversion, subsubversion, template)
+        if schemas[version].is_parsable():
+            self.dtype = template.compile_layout().dtype
+        else:
+            self.dtype = compile_decoder(version, subversion, subsubversion).dtype
+        self.names = self.dtype.names
+        self.struct = struct.Struct(f'>{len(self.names)}d')
+        self.f = open_binary(filename, "wb")
+        self.f.write(header)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def write_record(self, record):
+        """Append one record given as the dataclass (or controller tree) open_file returns."""
+        self.f.write(self.struct.pack(*(get_field_by_path(record, name) for name in self.names)))
+        self.count += 1
+
+    def write_columns(self, columns):
+        """Append records given as one array per field, a dict or a BenchmarkFrame."""
+        missing = [name for name in self.names if name not in columns]
+        if missing:
+            raise ValueError(f"Missing columns {missing}")
+        count = len(columns[self.names[0]])
+        values = np.empty((count, len(self.names)), dtype='>f8')
+        for i, name in enumerate(self.names):
+            values[:, i] = columns[name]
+        self.f.write(values.tobytes())
+        self.count += count
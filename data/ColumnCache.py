@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+from typing import Optional
+
+import numpy as np
+
+from data.BenchmarkFrame import BenchmarkFrame
+from data.ReportManifest import code_hash
+
+CACHE_DIR = os.environ.get("PLOTTING_TFE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "PlottingTFE"))
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+HASH_BLOCK = 1024 ** 2
+MANIFEST = "manifest.json"
+TIME_INDEX = ".time.npy"
+# Modules deciding the decoded columns, a change to them makes every entry a miss
+DECODING_MODULES = (
+    "data.Parser",
+    "data.VersionAndClasses",
+    "data.BenchmarkFile",
+    "data.CompleteParserClasses",
+    "data.Controllers",
+    "data.SubControllers",
+)
+
+
+def path_key(filename) -> str:
+    return hashlib.blake2b(os.path.abspath(filename).encode(), digest_size=8).hexdigest()
+
+
+def content_key(filename) -> str:
+    """Key of the current content of filename: path, size, mtime, a hash of its first and last MB
+    and of the decoding code."""
+    stat = os.stat(filename)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(code_hash(DECODING_MODULES).encode())
+    h.update(struct.pack('>Qd', stat.st_size, stat.st_mtime))
+    with open(filename, "rb") as f:
+        h.update(f.read(HASH_BLOCK))
+        if stat.st_size > HASH_BLOCK:
+            f.seek(-HASH_BLOCK, os.SEEK_END)
+            h.update(f.read())
+    return f"{path_key(filename)}-{h.hexdigest()}"
+
+
+def remove_entry(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ColumnCache:
+    """On-disk cache of decoded columns, one .npy per field plus a manifest per file.
+
+    Entries are keyed by content_key so an edited file is decoded again, a hit is memory
+    mapped read-only. The least recently used entries are evicted above max_bytes. A file
+    can also have just its time index cached, for read_window.
+    """
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def load(self, filename, class_type=None) -> Optional[BenchmarkFrame]:
+        entry = os.path.join(self.directory, content_key(filename))
+        try:
+            with open(os.path.join(entry, MANIFEST)) as f:
+                manifest = json.load(f)
+            columns = {name: np.load(os.path.join(entry, file), mmap_mode='r')
+                       for name, file in manifest["columns"].items()}
+            os.utime(os.path.join(entry, MANIFEST))
+        except (OSError, ValueError, KeyError):
+            # Missing, partly evicted by another process or corrupt, what is left is of no use
+            remove_entry(entry)
+            return None
+        return BenchmarkFrame(columns, manifest["optional"], class_type)
+
+    def load_time_index(self, filename) -> Optional[np.ndarray]:
+        path = os.path.join(self.directory, content_key(filename) + TIME_INDEX)
+        try:
+            times = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (OSError, ValueError):
+            remove_entry(path)
+            return None
+        return times
+
+    def store_time_index(self, filename, times: np.ndarray):
+        """Keep the cumulative time of every record of filename, used to binary search time windows."""
+        os.makedirs(self.directory, exist_ok=True)
+        key = content_key(filename)
+        path = os.path.join(self.directory, key + TIME_INDEX)
+        self.remove_stale(filename, key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(times, dtype=np.float64))
+        os.replace(tmp, path)
+        self.evict()
+
+    def remove_stale(self, filename, key):
+        """Older entries of the same path can never be hit again."""
+        for other in os.listdir(self.directory):
+            if other.startswith(path_key(filename)) and not other.startswith(key) and not other.endswith(".tmp"):
+                other = os.path.join(self.directory, other)
+                remove_entry(other)
+
+    def store(self, filename, frame: BenchmarkFrame, keep=()):
+        """Cache the columns of frame, keep are content keys that eviction must not remove."""
+        key = content_key(filename)
+        entry = os.path.join(self.directory, key)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, True)
+        os.makedirs(tmp)
+        files = {}
+        for i, (name, column) in enumerate(frame.columns.items()):
+            files[name] = f"{i}.npy"
+            np.save(os.path.join(tmp, files[name]), np.asarray(column, dtype=np.float64))
+        manifest = {
+            "source": os.path.abspath(filename),
+            "columns": files,
+            "optional": sorted(frame.optional),
+            "size": sum(os.path.getsize(os.path.join(tmp, file)) for file in files.values()),
+        }
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        self.remove_stale(filename, key)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp, True)
+        self.evict(keep)
+
+    def evict(self, keep=()):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name in keep:
+                continue
+            try:
+                if name.endswith(TIME_INDEX):
+                    path = os.path.join(self.directory, name)
+                    entries.append((os.path.getmtime(path), os.path.getsize(path), name))
+                    continue
+                manifest_path = os.path.join(self.directory, name, MANIFEST)
+                with open(manifest_path) as f:
+                    size = json.load(f)["size"]
+                entries.append((os.path.getmtime(manifest_path), size, name))
+            except (OSError, ValueError, KeyError):
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            remove_entry(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, True)
+
+
+default_cache = ColumnCache()
@@ -4,23 +4,24 @@ import struct
 from dataclasses import dataclass, fields
 from typing import Optional, Type
 import copy
-from data.Parser import ParsableClass, is_field_subclass_of, plot_variable, show_plots, get_all_field_paths, \
-    set_field_by_path, get_field_by_path, plot_variable_fct, plot_2d
+from data.Parser import ParsableClass, FigureSelection, is_field_subclass_of, plot_variable, show_plots, \
+    get_all_field_paths, set_field_by_path, get_field_by_path, plot_variable_fct, plot_2d
 
-import matplotlib.pyplot as plt
+from data.LazyModule import LazyModule
+plt = LazyModule("matplotlib.pyplot")
 import numpy as np
-def call_child_end_display(results):
-    for c in results:
-        c.controller.dt = c.dt
-    results = [r.controller for r in results]
-    for r in results:
-        paths = get_all_field_paths(r)
-        for path in paths:
-            if issubclass(type(get_field_by_path(r, path)), SubController):
-                continue
-            set_field_by_path(r, path, get_field_by_path(r, path)/4095)
-    type(results[0]).display_data(results)
-    show_plots()
+DUTY_CYCLE_RANGE = 4095
+
+
+def call_child_end_display(results, figures=None):
+    figures = FigureSelection.of(figures).sub("controller")
+    if figures.any():
+        # Controller outputs are logged in PWM counts, shown as a duty cycle
+        controllers = results.subrecords("controller").transform(lambda values: values / DUTY_CYCLE_RANGE)
+        type(controllers.layout.template).display_data(controllers, figures)
+    # tight_layout would create a blank figure when the selection matched none
+    if figures.drawn:
+        show_plots()
 
 @dataclass
 class BenchmarkAngleV02(ParsableClass):
@@ -37,29 +38,29 @@ class BenchmarkAngleV02(ParsableClass):
     right_motor: Optional[float] = None
     controller: Optional[SubController] = None
     @staticmethod
-    def display_data(results):
-        plt.figure()
-        plot_variable(results, "rotational_position", "Position", title="Rotational Position & Target (deg)", ylabel="Position (deg)")
-        plot_variable(results, "rotational_target", "Target")
-        plt.figure()
-        plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed")
-        plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
-        #plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
-        plt.figure()
-        plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed with Kalman")
-        plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
-        plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
-        plt.figure()
-        plot_variable(results, "error", "Total Error", title="Total Error Over Time", ylabel="Total Error (deg²)")
-        plt.figure()
-        plot_variable(results, "currentError", "Current Error", title="Current Error Over Time", ylabel="error² (deg²)")
-        plt.figure()
-        plot_variable_fct(results, lambda x:x.rotational_target - x.rotational_position, label="Angular error", title="Error in degrees in function of the time", ylabel="Error(deg)")
-        plt.figure()
-        plot_variable_fct(results, lambda x:x.rotational_position%360-180, label="Angular position", title="Angular position & target in degrees in function of the time", ylabel="Angular Position/Target(deg)")
-        plot_variable_fct(results, lambda x:x.rotational_target%360-180, label="Angular target")
-        plt.figure()
-        call_child_end_display(results)
+    def display_data(results, figures=None):
+        figures = FigureSelection.of(figures)
+        if figures.figure("rotational_tracking"):
+            plot_variable(results, "rotational_position", "Position", title="Rotational Position & Target (deg)", ylabel="Position (deg)")
+            plot_variable(results, "rotational_target", "Target")
+        if figures.figure("rotational_speed"):
+            plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed")
+            plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
+            #plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
+        if figures.figure("rotational_speed_kalman"):
+            plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed with Kalman")
+            plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
+            plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
+        if figures.figure("total_error"):
+            plot_variable(results, "error", "Total Error", title="Total Error Over Time", ylabel="Total Error (deg²)")
+        if figures.figure("current_error"):
+            plot_variable(results, "currentError", "Current Error", title="Current Error Over Time", ylabel="error² (deg²)")
+        if figures.figure("rotational_error"):
+            plot_variable_fct(results, lambda x:x.rotational_target - x.rotational_position, label="Angular error", title="Error in degrees in function of the time", ylabel="Error(deg)")
+        if figures.figure("wrapped_rotation"):
+            plot_variable_fct(results, lambda x:x.rotational_position%360-180, label="Angular position", title="Angular position & target in degrees in function of the time", ylabel="Angular Position/Target(deg)")
+            plot_variable_fct(results, lambda x:x.rotational_target%360-180, label="Angular target")
+        call_child_end_display(results, figures)
 
 @dataclass
 class BenchmarkDistanceV02(ParsableClass):
@@ -81,25 +82,25 @@ class BenchmarkDistanceV02(ParsableClass):
     currentPositionY: Optional[float] = None
     currentPositionAngle: Optional[float] = None
     @staticmethod
-    def display_data(results):
-        plt.figure()
-        plot_variable(results, "error", "Error", title="Cumulative error (mm²)", ylabel="Error(mm²)")
-        plt.figure()
-        plot_variable(results, "rotational_position", "Position", title="Rotational Position & Target (deg)", ylabel="Position (deg)")
-        plot_variable(results, "rotational_target", "Target")
-        plt.figure()
-        plot_variable(results, "translational_position", "Position", title="Translational Position & Target (mm)", ylabel="Position (mm)")
-        plot_variable(results, "translational_target", "Target")
-        plt.figure()
-        plot_variable(results, "translational_ramp_speed", "Ramp Speed", title="Translational Speed")
-        plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
-        #plot_variable(results, "translational_other_estimated_speed", "Estimated Speed Kalman")
-        plt.figure()
-        plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
-        plt.figure()
-        plot_variable_fct(results, lambda x:x.translational_target - x.translational_position, label="Translational error", title="Error in mm in function of the time", ylabel="Error(mm)")
-        plt.figure()
-        call_child_end_display(results)
+    def display_data(results, figures=None):
+        figures = FigureSelection.of(figures)
+        if figures.figure("total_error"):
+            plot_variable(results, "error", "Error", title="Cumulative error (mm²)", ylabel="Error(mm²)")
+        if figures.figure("rotational_tracking"):
+            plot_variable(results, "rotational_position", "Position", title="Rotational Position & Target (deg)", ylabel="Position (deg)")
+            plot_variable(results, "rotational_target", "Target")
+        if figures.figure("translational_tracking"):
+            plot_variable(results, "translational_position", "Position", title="Translational Position & Target (mm)", ylabel="Position (mm)")
+            plot_variable(results, "translational_target", "Target")
+        if figures.figure("translational_speed"):
+            plot_variable(results, "translational_ramp_speed", "Ramp Speed", title="Translational Speed")
+            plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
+            #plot_variable(results, "translational_other_estimated_speed", "Estimated Speed Kalman")
+        if figures.figure("translational_estimated_speed"):
+            plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
+        if figures.figure("translational_error"):
+            plot_variable_fct(results, lambda x:x.translational_target - x.translational_position, label="Translational error", title="Error in mm in function of the time", ylabel="Error(mm)")
+        call_child_end_display(results, figures)
 
 @dataclass
 class BenchmarkDistanceAngleV01(ParsableClass):
@@ -154,59 +155,50 @@ class UniversalBenchmarkV01(ParsableClass):
     rightMotor: Optional[float] = None
     controller: Optional[Controller] = None
     @staticmethod
-    def display_data(results):
-        plt.figure()
-        plot_variable(results, "rotational_position", "Position", title="Rotational Position & Target (deg)",
-                      ylabel="Position (deg)")
-        plot_variable(results, "rotational_target", "Target")
-        plt.figure()
-        plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed")
-        plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
-        # plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
-        plt.figure()
-        plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed with Kalman")
-        plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
-        plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
-        plt.figure()
-        plot_variable(results, "error", "Total Error", title="Total Error Over Time", ylabel="Total Error (deg²)")
-        plt.figure()
-        plot_variable(results, "currentErrorAngle", "Current Error", title="Current Error Over Time", ylabel="error² (deg²)")
-        plt.figure()
-        plot_variable(results, "currentErrorDistance", "Current Error", title="Current Error Over Time for the distance", ylabel="error² (mm²)")
-        plt.figure()
-        plot_variable_fct(results, lambda x: x.rotational_target - x.rotational_position, label="Angular error",
-                          title="Error in degrees in function of the time", ylabel="Error(deg)")
-        plt.figure()
-        plot_variable_fct(results, lambda x: x.rotational_position % 360 - 180, label="Angular position",
-                          title="Angular position & target in degrees in function of the time",
-                          ylabel="Angular Position/Target(deg)")
-        plot_variable_fct(results, lambda x: x.rotational_target % 360 - 180, label="Angular target")
-        plt.figure()
-        plot_variable(results, "translational_position", "Position", title="Translational Position & Target (mm)", ylabel="Position (mm)")
-        plot_variable(results, "translational_target", "Target")
-        plt.figure()
-        plot_variable(results, "translational_ramp_speed", "Ramp Speed", title="Translational Speed")
-        plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
-        #plot_variable(results, "translational_other_estimated_speed", "Estimated Speed Kalman")
-        plt.figure()
-        plot_variable(results, "translational_ramp_speed", "Ramp Speed", title="Translational Speed")
-        plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
-        plot_variable(results, "translational_other_estimated_speed", "Estimated Speed Kalman")
-        plt.figure()
-        plot_2d(results, "currentPositionX", "currentPositionY", "Position", title="Current Position", ylabel="Position y (mm)", xlabel="Position x (mm)")
-
-        plt.figure()
-        plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
-        plt.figure()
-        plot_variable_fct(results, lambda x:x.translational_target - x.translational_position, label="Translational error", title="Error in mm in function of the time", ylabel="Error(mm)")
-        plt.figure()
-        call_child_end_display(results)
-
-
+    def display_data(results, figures=None):
+        figures = FigureSelection.of(figures)
+        if figures.figure("rotational_tracking"):
+            plot_variable(results, "rotational_position", "Position", title="Rotational Position & Target (deg)",
+                          ylabel="Position (deg)")
+            plot_variable(results, "rotational_target", "Target")
+        if figures.figure("rotational_speed"):
+            plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed")
+            plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
+            # plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
+        if figures.figure("rotational_speed_kalman"):
+            plot_variable(results, "rotational_ramp_speed", "Ramp Speed", title="Angular Speed with Kalman")
+            plot_variable(results, "rotational_estimated_speed", "Estimated Speed", ylabel="Speed (deg/s)")
+            plot_variable(results, "rotational_other_estimated_speed", "Other Estimation")
+        if figures.figure("total_error"):
+            plot_variable(results, "error", "Total Error", title="Total Error Over Time", ylabel="Total Error (deg²)")
+        if figures.figure("angle_error"):
+            plot_variable(results, "currentErrorAngle", "Current Error", title="Current Error Over Time", ylabel="error² (deg²)")
+        if figures.figure("distance_error"):
+            plot_variable(results, "currentErrorDistance", "Current Error", title="Current Error Over Time for the distance", ylabel="error² (mm²)")
+        if figures.figure("rotational_error"):
+            plot_variable_fct(results, lambda x: x.rotational_target - x.rotational_position, label="Angular error",
+                              title="Error in degrees in function of the time", ylabel="Error(deg)")
+        if figures.figure("wrapped_rotation"):
+            plot_variable_fct(results, lambda x: x.rotational_position % 360 - 180, label="Angular position",
+                              title="Angular position & target in degrees in function of the time",
+                              ylabel="Angular Position/Target(deg)")
+            plot_variable_fct(results, lambda x: x.rotational_target % 360 - 180, label="Angular target")
+        if figures.figure("translational_tracking"):
+            plot_variable(results, "translational_position", "Position", title="Translational Position & Target (mm)", ylabel="Position (mm)")
+            plot_variable(results, "translational_target", "Target")
+        if figures.figure("translational_speed"):
+            plot_variable(results, "translational_ramp_speed", "Ramp Speed", title="Translational Speed")
+            plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
+            #plot_variable(results, "translational_other_estimated_speed", "Estimated Speed Kalman")
+        if figures.figure("translational_speed_kalman"):
+            plot_variable(results, "translational_ramp_speed", "Ramp Speed", title="Translational Speed")
+            plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
+            plot_variable(results, "translational_other_estimated_speed", "Estimated Speed Kalman")
+        if figures.figure("trajectory"):
+            plot_2d(results, "currentPositionX", "currentPositionY", "Position", title="Current Position", ylabel="Position y (mm)", xlabel="Position x (mm)")
 
-binaryFileMapForCompleteParser = {
-    5: BenchmarkDistanceAngleV01,
-    12: BenchmarkAngleV02,
-    13: BenchmarkDistanceV02,
-    14: UniversalBenchmarkV01,
-}
\ No newline at end of file
+        if figures.figure("translational_estimated_speed"):
+            plot_variable(results, "translational_estimated_speed", "Estimated Speed", ylabel="Speed (mm/s)")
+        if figures.figure("translational_error"):
+            plot_variable_fct(results, lambda x:x.translational_target - x.translational_position, label="Translational error", title="Error in mm in function of the time", ylabel="Error(mm)")
+        call_child_end_display(results, figures)
@@ -1,10 +1,11 @@
 import struct
 from dataclasses import dataclass, fields
 from typing import Optional, Type
-import matplotlib.pyplot as plt
+from data.LazyModule import LazyModule
+plt = LazyModule("matplotlib.pyplot")
 import copy
-from data.Parser import ParsableClass, plot_variable, show_plots, get_all_field_paths, set_field_by_path, \
-    get_field_by_path
+from data.Parser import ParsableClass, FigureSelection, child_records, plot_variable, show_plots, \
+    get_all_field_paths, set_field_by_path, get_field_by_path
 from data.SubControllers import SubController
 
 controller_types = []
@@ -23,7 +24,7 @@ class Controller(ParsableClass):
         return ParsableClass.generate(a, data)
 
     @staticmethod
-    def display_data(results):
+    def display_data(results, figures=None):
         pass
 
 @dataclass
@@ -32,16 +33,12 @@ class TripleBasicController(ParsableClass):
     angle_controller: Optional[SubController] = None
     distance_angle_controller: Optional[SubController] = None
     @staticmethod
-    def display_data(results):
-        for c in results:
-            c.distance_controller.dt = c.dt
-            c.angle_controller.dt = c.dt
-            c.distance_angle_controller.dt = c.dt
-        type(results[0].distance_controller).show([r.distance_controller for r in results], "distance controller")
-        plt.figure()
-        type(results[0].angle_controller).show([r.angle_controller for r in results], "angle controller")
-        plt.figure()
-        type(results[0].distance_angle_controller).show([r.distance_angle_controller for r in results], "distance angle controller")
+    def display_data(results, figures=None):
+        figures = FigureSelection.of(figures)
+        for name in ("distance_controller", "angle_controller", "distance_angle_controller"):
+            if figures.sub(name).any():
+                controllers = child_records(results, name)
+                type(controllers[0]).show(controllers, name.replace("_", " "), figures.sub(name))
 
 data = [
     Controller,
@@ -0,0 +1,94 @@
+import numpy as np
+
+from data.LazyModule import LazyModule
+plt = LazyModule("matplotlib.pyplot")
+
+# Shorter series are plotted as they are
+DECIMATE_FROM = 50_000
+
+
+class MinMaxPyramid:
+    """Indices of the min and max sample of every block of a series, for blocks of 2, 4, 8... samples.
+
+    Level k holds one (min, max) pair per block of 2**k samples, each level is built from the
+    one below, so the whole pyramid costs about two index arrays of the length of the series.
+    """
+    def __init__(self, y):
+        self.y = y
+        self.levels = []
+        imin = imax = np.arange(len(y))
+        while len(imin) > 1:
+            imin, imax = self._coarsen(imin, imax)
+            self.levels.append((imin, imax))
+
+    def _coarsen(self, imin, imax):
+        even = len(imin) - len(imin) % 2
+        a, b = imin[0:even:2], imin[1:even:2]
+        # NaN never compares smaller or larger, the first sample is kept and shows as a gap
+        new_min = np.where(self.y[b] < self.y[a], b, a)
+        a, b = imax[0:even:2], imax[1:even:2]
+        new_max = np.where(self.y[b] > self.y[a], b, a)
+        if even < len(imin):
+            new_min = np.append(new_min, imin[-1])
+            new_max = np.append(new_max, imax[-1])
+        return new_min, new_max
+
+    def indices(self, start, stop, bins) -> np.ndarray:
+        """Sorted sample indices drawing [start, stop) with at least bins min/max pairs.
+
+        Blocks overlapping the range are taken whole, so the envelope reaches past its edges.
+        """
+        count = stop - start
+        if count <= 2 * bins:
+            return np.arange(start, stop)
+        level = min(int(np.log2(count / bins)), len(self.levels))
+        imin, imax = self.levels[level - 1]
+        first = start >> level
+        last = ((stop - 1) >> level) + 1
+        imin, imax = imin[first:last], imax[first:last]
+        # Min and max of a block are drawn in sample order, the line then covers the block vertically
+        return np.stack([np.minimum(imin, imax), np.maximum(imin, imax)], axis=1).ravel()
+
+
+class DecimatedLine:
+    """Line2D showing the min/max envelope of x, y at the pixel width of its axes.
+
+    update() picks the pyramid level for the visible x range, it is called when the axes are
+    zoomed, panned or resized so spikes stay visible at every scale.
+    """
+    def __init__(self, line, x, y, pyramid: MinMaxPyramid):
+        self.line = line
+        self.x = x
+        self.y = y
+        self.pyramid = pyramid
+
+    def indices(self, ax) -> np.ndarray:
+        x0, x1 = sorted(ax.get_xlim())
+        start = max(int(np.searchsorted(self.x, x0, side="left")) - 1, 0)
+        stop = min(int(np.searchsorted(self.x, x1, side="right")) + 1, len(self.x))
+        return self.pyramid.indices(start, max(stop, start + 1), max(int(ax.bbox.width), 1))
+
+    def update(self, ax):
+        i = self.indices(ax)
+        self.line.set_data(self.x[i], self.y[i])
+
+
+def plot_decimated(x, y, *args, **kwargs):
+    """plt.plot of one time series, long ones reduced to their min/max envelope per pixel.
+
+    x has to be sorted. The envelope is computed again from a MinMaxPyramid whenever the view
+    changes, so redraws cost the same whatever the length of the series.
+    """
+    ax = plt.gca()
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) < DECIMATE_FROM or np.any(np.diff(x) < 0):
+        return ax.plot(x, y, *args, **kwargs)[0]
+    pyramid = MinMaxPyramid(y)
+    i = pyramid.indices(0, len(x), max(int(ax.bbox.width), 1))
+    line = ax.plot(x[i], y[i], *args, **kwargs)[0]
+    decimated = DecimatedLine(line, x, y, pyramid)
+    # Plain functions are kept alive by the callback registries, bound methods would not be
+    ax.callbacks.connect("xlim_changed", lambda ax: decimated.update(ax))
+    ax.figure.canvas.mpl_connect("resize_event", lambda event: decimated.update(ax))
+    return line
@@ -0,0 +1,20 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Used for matplotlib so decoding never pays for the plotting stack, and so a backend
+    chosen with matplotlib.use() before the first plot still applies.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self._module is None else ' (loaded)'}>"
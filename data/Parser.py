@@ -1,11 +1,17 @@
 from typing import Type, TypeVar, List, Generic
+from collections.abc import Sequence
 import dataclasses
 import struct
 import copy
 from typing import Any, get_origin, get_args, Union, Optional
 import inspect
-import matplotlib.pyplot as plt
+from data.LazyModule import LazyModule
+plt = LazyModule("matplotlib.pyplot")
+import numpy as np
+from data.BenchmarkFrame import BenchmarkFrame
+from data.Decimation import plot_decimated
 T = TypeVar('T')
+TRANSPOSE_BLOCK = 2048
 class CustomParser(Generic[T]):
     dataclass_type: Type[T]
     bitmask_function: callable
@@ -16,6 +22,8 @@ class CustomParser(Generic[T]):
             field for i, field in enumerate(self.ALL_FIELDS) if self.bitMask & (1 << i)
         ]
         self.field_count = bin(self.bitMask).count("1")
+        self.struct = struct.Struct(f'>{self.field_count}d')
+        self.dtype = np.dtype([(field, '>f8') for field in self.active_fields])
 
     def get_length(self):
         return self.field_count * 8
@@ -25,10 +33,58 @@ class CustomParser(Generic[T]):
             raise ValueError(
                 f'Not enough bytes to unpack {self.__class__.__name__} (need {self.get_length()} bytes)'
             )
-        values = struct.unpack(f'>{self.field_count}d', data)
+        values = self.struct.unpack(data)
         field_dict = dict(zip(self.active_fields, values))
         return self.dataclass_type(**field_dict)
 
+    def columns_from_bytes(self, data) -> dict[str, np.ndarray]:
+        """Decode every complete record of data at once, a trailing partial record is ignored."""
+        return decode_columns(data, self.dtype)
+
+
+def decode_columns(data, dtype: np.dtype) -> dict[str, np.ndarray]:
+    records = np.frombuffer(data, dtype=dtype, count=len(data) // dtype.itemsize)
+    return records_to_columns(records)
+
+def read_values(f, dtype: np.dtype, block_records=None) -> tuple[np.ndarray, int]:
+    """Remaining records of f as one (field, record) array, and the size of a trailing partial record.
+
+    With block_records the body is read by blocks of that many records, each kept as one array
+    per field until they are joined field by field, so the values are never held twice.
+    """
+    if block_records is None:
+        data = f.read()
+        count = len(data) // dtype.itemsize
+        return records_to_values(np.frombuffer(data, dtype=dtype, count=count)), len(data) - count * dtype.itemsize
+    pieces = [[] for _ in dtype.names]
+    count = rest = 0
+    while data := f.read(block_records * dtype.itemsize):
+        records = np.frombuffer(data, dtype=dtype, count=len(data) // dtype.itemsize)
+        rest = len(data) - len(records) * dtype.itemsize
+        count += len(records)
+        for field, name in zip(pieces, dtype.names):
+            field.append(records[name].astype(np.float64))
+    values = np.empty((len(dtype.names), count))
+    for row, field in zip(values, pieces):
+        if field:
+            np.concatenate(field, out=row)
+            field.clear()
+    return values, rest
+
+def records_to_columns(records: np.ndarray) -> dict[str, np.ndarray]:
+    """Turn big-endian records into one contiguous native float64 array per field."""
+    return dict(zip(records.dtype.names, records_to_values(records)))
+
+def records_to_values(records: np.ndarray) -> np.ndarray:
+    """Same as records_to_columns but as a single (field, record) array."""
+    names = records.dtype.names
+    values = records.view('>f8').reshape(len(records), len(names))
+    columns = np.empty((len(names), len(records)), dtype=np.float64)
+    # Transposing in row blocks keeps both sides in cache, much faster than one big transpose.
+    for start in range(0, len(records), TRANSPOSE_BLOCK):
+        columns[:, start:start + TRANSPOSE_BLOCK] = values[start:start + TRANSPOSE_BLOCK].T
+    return columns
+
 def set_field_by_path(obj, path: str, value: Any):
     parts = path.split(".")
     for part in parts[:-1]:
@@ -87,15 +143,115 @@ def get_static_method_if_possible(field_type, method_name):
                 return method  # not bound, static method
     return None
 
+def compile_builder(obj, offsets, prefix=""):
+    """Return a function building a copy of obj from a flat row of values, without deepcopy."""
+    cls = type(obj)
+    leaves = []
+    children = []
+    for field in dataclasses.fields(obj):
+        value = getattr(obj, field.name)
+        path = f"{prefix}{field.name}"
+        if dataclasses.is_dataclass(value):
+            children.append((field.name, compile_builder(value, offsets, prefix=path + ".")))
+        else:
+            leaves.append((field.name, offsets[path]))
+
+    def build(row):
+        kwargs = {name: row[offset] for name, offset in leaves}
+        for name, child in children:
+            kwargs[name] = child(row)
+        return cls(**kwargs)
+    return build
+
+class ParsableLayout:
+    """Flat column map of a generated ParsableClass tree: every leaf path gets one float64 column."""
+    def __init__(self, template):
+        self.template = template
+        self.paths = get_all_field_paths(template)
+        self.offsets = {path: i for i, path in enumerate(self.paths)}
+        self.dtype = np.dtype([(path, '>f8') for path in self.paths])
+        self.build = compile_builder(template, self.offsets)
+        self._sublayouts = {}
+
+    def get_length(self):
+        return self.dtype.itemsize
+
+    def sublayout(self, prefix) -> tuple['ParsableLayout', list[int]]:
+        """Layout of the nested ParsableClass at prefix and the rows of its columns in this layout."""
+        if prefix not in self._sublayouts:
+            layout = ParsableLayout(get_field_by_path(self.template, prefix))
+            rows = [self.offsets[f"{prefix}.{path}"] for path in layout.paths]
+            self._sublayouts[prefix] = (layout, rows)
+        return self._sublayouts[prefix]
+
+    def columns_from_bytes(self, data) -> dict[str, np.ndarray]:
+        return decode_columns(data, self.dtype)
+
+    def decode(self, data) -> 'ParsedRecords':
+        if len(data) % self.get_length():
+            raise ValueError(f"Expected {self.get_length()} bytes, got {len(data) % self.get_length()}")
+        records = np.frombuffer(data, dtype=self.dtype)
+        return ParsedRecords(self, records_to_values(records))
+
+    def read(self, f, block_records=None) -> 'ParsedRecords':
+        """Same as decode for the remaining body of f, see read_values for block_records."""
+        values, rest = read_values(f, self.dtype, block_records)
+        if rest:
+            raise ValueError(f"Expected {self.get_length()} bytes, got {rest}")
+        return ParsedRecords(self, values)
+
+class ParsedRecords(Sequence):
+    """Decoded records of a ParsableClass file, kept as columns.
+
+    The nested objects of a record are only built the first time it is accessed, then reused.
+    attributes are extra columns set on every built object, like the dt of a sub controller.
+    """
+    def __init__(self, layout: ParsableLayout, values: np.ndarray, attributes=None):
+        self.layout = layout
+        self.values = values
+        self.attributes = attributes or {}
+        self._objects = [None] * values.shape[1]
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        if self._objects[i] is None:
+            self._objects[i] = self.layout.build(self.values[:, i].tolist())
+            for name, column in self.attributes.items():
+                setattr(self._objects[i], name, column[i].item())
+        return self._objects[i]
+
+    def column(self, path: str) -> np.ndarray:
+        return self.values[self.layout.offsets[path]]
+
+    def subrecords(self, prefix, attributes=("dt",)) -> 'ParsedRecords':
+        """Records of the nested ParsableClass at prefix, the given top level columns carried as attributes."""
+        layout, rows = self.layout.sublayout(prefix)
+        # Records that are themselves nested already carry these as attributes
+        carried = {name: self.column(name) for name in attributes if name in self.layout.offsets}
+        return ParsedRecords(layout, self.values[rows], {**self.attributes, **carried})
+
+    def frame(self) -> BenchmarkFrame:
+        """Columns of these records and their attributes, without building any record."""
+        columns = {path: self.values[offset] for path, offset in self.layout.offsets.items()}
+        return BenchmarkFrame({**columns, **self.attributes})
+
+    def transform(self, function) -> 'ParsedRecords':
+        """New records whose (field, record) values are function(values), these records are left untouched."""
+        return ParsedRecords(self.layout, function(self.values), self.attributes)
+
 class ParsableClass:
     def parse(self, f):
-        field_paths = get_all_field_paths(self)
-        expected_len = 8 * len(field_paths)
-        results = []
-        while data := f.read(expected_len):
-            a = copy.deepcopy(self)
-            results.append(a.fill_parsable_from_bytes(data, expected_len, field_paths))
-        return results
+        return self.compile_layout().decode(f.read())
+    def compile_layout(self) -> ParsableLayout:
+        return ParsableLayout(self)
     def fill_parsable_from_bytes(self, data: bytes, expected_len, field_paths):
         if len(data) < expected_len:
             raise ValueError(f"Expected {expected_len} bytes, got {len(data)}")
@@ -112,40 +268,121 @@ class ParsableClass:
                 setattr(i, f.name, get_static_method_if_possible(f.type, "generate")(None, data))
         return i
     @staticmethod
-    def display_data(results):
+    def display_data(results, figures=None):
         raise Exception("Not implemented")
 
 
 
 class CompleteParser:
-    def __init__(self, f, type):
+    def __init__(self, f, type, layout=None, block_records=None):
         self.f = f
+        self.block_records = block_records
         self.data_type = type
-        self.data_type.generate(self.data_type, self.f)
-        self.data_type.update()
+        if layout is None:
+            self.data_type.generate(self.data_type, self.f)
+            self.data_type.update()
+            layout = self.data_type.compile_layout()
+        self.layout = layout
         self.results = None
 
     def get_result(self):
         if self.results is None:
-            self.results = self.data_type.parse(self.f)
+            self.results = self.layout.read(self.f, self.block_records)
         return self.results
-    def display(self):
-        type(self.data_type).display_data(self.get_result())
-def plot_variable(results, attr, label=None, ylabel=None, title=None):
-    values = []
+    def display(self, figures=None):
+        type(self.data_type).display_data(self.get_result(), FigureSelection.of(figures))
+
+class FigureSelection:
+    """Named figures of a report, figures=None selects all of them.
+
+    Names are dotted paths like "controller.angle_controller.kp", selecting a name also
+    selects every figure below it. A figure is only created, and its data only computed,
+    when figure(name) or draw(name, ...) finds it selected. drawn lists the figures made.
+    """
+    def __init__(self, figures=None, prefix="", drawn=None):
+        self.figures = None if figures is None else list(figures)
+        self.prefix = prefix
+        self.drawn = [] if drawn is None else drawn
+
+    @staticmethod
+    def of(figures) -> 'FigureSelection':
+        return figures if isinstance(figures, FigureSelection) else FigureSelection(figures)
+
+    def selected(self, name) -> bool:
+        name = self.prefix + name
+        return self.figures is None or any(name == f or name.startswith(f + ".") for f in self.figures)
+
+    def sub(self, name) -> 'FigureSelection':
+        """Selection of the figures below name, like the ones of a controller."""
+        return FigureSelection(self.figures, f"{self.prefix}{name}.", self.drawn)
+
+    def any(self) -> bool:
+        """Whether a figure below the prefix of this selection is selected."""
+        prefix = self.prefix.rstrip(".")
+        return self.figures is None or any(f == prefix or f.startswith(self.prefix) or prefix.startswith(f + ".")
+                                           for f in self.figures)
+
+    def figure(self, name) -> bool:
+        """Make the figure name current, creating it the first time, if it is selected."""
+        if not self.selected(name):
+            return False
+        plt.figure(self.prefix + name)
+        if self.prefix + name not in self.drawn:
+            self.drawn.append(self.prefix + name)
+        return True
+
+    def draw(self, name, plot, *args, **kwargs):
+        """Call plot, which opens figures of its own, if name is selected and label them name."""
+        if not self.selected(name):
+            return None
+        before = set(plt.get_fignums())
+        result = plot(*args, **kwargs)
+        for num in sorted(set(plt.get_fignums()) - before):
+            plt.figure(num).set_label(self.prefix + name)
+        self.drawn.append(self.prefix + name)
+        return result
+
+def child_records(results, name):
+    """Records of the field name of every result, each carrying the dt of its parent."""
+    if isinstance(results, ParsedRecords):
+        return results.subrecords(name)
     for r in results:
-        for a in attr.split("."):
-            if r is None:
-                break
-            r = getattr(r, a, None)
-        values.append(r)
-    #values = [getattr(r, attr, None) for r in results]
-    times = [getattr(r, 'dt', 0.0) for r in results]
-
-    if all(v is None for v in values):
-        return  # Skip empty
-
-    plt.plot(times, values, label=label or attr)
+        getattr(r, name).dt = r.dt
+    return [getattr(r, name) for r in results]
+
+def record_columns(results):
+    """BenchmarkFrame of results when they are stored as columns, None for a list of records."""
+    if isinstance(results, ParsedRecords):
+        return results.frame()
+    if isinstance(results, BenchmarkFrame):
+        return results
+    return None
+
+def record_times(frame: BenchmarkFrame) -> np.ndarray:
+    return frame["dt"] if "dt" in frame else np.zeros(len(frame))
+
+def plot_variable(results, attr, label=None, ylabel=None, title=None):
+    frame = record_columns(results)
+    if frame is not None:
+        if attr not in frame:
+            return  # Skip empty
+        values = frame[attr]
+        times = record_times(frame)
+    else:
+        values = []
+        for r in results:
+            for a in attr.split("."):
+                if r is None:
+                    break
+                r = getattr(r, a, None)
+            values.append(r)
+        #values = [getattr(r, attr, None) for r in results]
+        times = [getattr(r, 'dt', 0.0) for r in results]
+
+        if all(v is None for v in values):
+            return  # Skip empty
+
+    plot_decimated(times, values, label=label or attr)
     plt.xlabel("Time (s)")
     ax = plt.gca()  # get current axes
     title_text = ax.get_title()
@@ -163,11 +400,19 @@ def plot_variable(results, attr, label=None, ylabel=None, title=None):
     plt.grid(True)
 
 def plot_variable_fct(results, fct, label=None, ylabel=None, title=None):
-    values = [fct(r) for r in results]
-    times = [getattr(r, 'dt', 0.0) for r in results]
-    if all(v is None for v in values):
-        return
-    plt.plot(times, values, label=label)
+    """fct of every result against time, fct gets whole columns when results are columnar."""
+    frame = record_columns(results)
+    if frame is not None:
+        values = fct(frame)
+        times = record_times(frame)
+        if values is None:
+            return
+    else:
+        values = [fct(r) for r in results]
+        times = [getattr(r, 'dt', 0.0) for r in results]
+        if all(v is None for v in values):
+            return
+    plot_decimated(times, values, label=label)
     plt.xlabel("Time (s)")
     ax = plt.gca()  # get current axes
     if title:
@@ -2,15 +2,16 @@ import io
 import struct
 import data.SubControllers as ctrl
 import data.CompleteParserClasses as cpc
+from data.BenchmarkWriter import encode_header
+from data.VersionAndClasses import schemas
 
 stream = io.BytesIO()
 
-stream.write(struct.pack('>Q', 12))
-stream.write(struct.pack('>B', 1))
+stream.write(encode_header(12, template=cpc.BenchmarkAngleV02(controller=ctrl.SubControllerPID())))
 
 stream.seek(0)
 version = struct.unpack(">Q", stream.read(8))[0]
-a = cpc.binaryFileMapForCompleteParser[version]()
+a = schemas[version].target()
 a.generate(a, stream)
 print(a)
 a.update()
\ No newline at end of file
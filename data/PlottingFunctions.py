@@ -1,16 +1,51 @@
-import matplotlib.pyplot as plt
+from data.LazyModule import LazyModule
+plt = LazyModule("matplotlib.pyplot")
 import numpy as np
+from data.BenchmarkFrame import BenchmarkFrame
+
+
+def column(data, name) -> np.ndarray:
+    """Field name of every record of data as a float array.
+
+    A BenchmarkFrame hands out its column as is, a list of records is gathered in one pass.
+    """
+    if isinstance(data, BenchmarkFrame):
+        return getattr(data, name)
+    return np.array([getattr(d, name) for d in data], dtype=float)
+
+def values_of(data, fct) -> np.ndarray:
+    """fct of every record of data, a BenchmarkFrame is passed whole so fct works on its columns."""
+    if isinstance(data, BenchmarkFrame):
+        return np.asarray(fct(data), dtype=float)
+    return np.array([fct(d) for d in data], dtype=float)
+
+def derivative(values, robot_dt) -> np.ndarray:
+    """Forward difference of values over the real spacing of the records.
+
+    robot_dt[i] is the time elapsed before record i, so going from record i to i+1 takes
+    robot_dt[i+1]. The result has one value less than values.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(values) / robot_dt[1:]
+
+def second_derivative(values, robot_dt) -> np.ndarray:
+    """Three point second derivative at the inner records, exact for non uniform spacing."""
+    before = robot_dt[1:-1]
+    after = robot_dt[2:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 2 * (before * values[2:] - (before + after) * values[1:-1] + after * values[:-2]) \
+            / (before * after * (before + after))
 def plot_translational_tracking(data):
     if not data:
         print("No data to plot.")
         return
 
     # Use d.dt (accumulated time) as x-axis
-    time = [d.dt for d in data]
+    time = column(data, "dt")
 
     # Extract translational values
-    target = [d.translational_target for d in data]
-    position = [d.translational_position for d in data]
+    target = column(data, "translational_target")
+    position = column(data, "translational_position")
 
     # Plot
     plt.figure()
@@ -28,15 +63,15 @@ def plot_rotational_speed_comparison(data, other=False):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    ramp_speed = [d.ramp_speed_deg for d in data]
-    estimated_speed = [d.estimated_speed_deg for d in data]
+    time = column(data, "dt")
+    ramp_speed = column(data, "ramp_speed_deg")
+    estimated_speed = column(data, "estimated_speed_deg")
 
     plt.figure()
     plt.plot(time, ramp_speed, label="Ramp Speed (deg/s)")
     plt.plot(time, estimated_speed, label="Estimated Speed (deg/s)")
     if other:
-        other_estimated_speed = [d.other_estimated_speed_deg for d in data]
+        other_estimated_speed = column(data, "other_estimated_speed_deg")
         plt.plot(time, other_estimated_speed, label="Other Estimated Speed (deg/s)")
     plt.xlabel("Time (s)")
     plt.ylabel("Speed (deg/s)")
@@ -51,20 +86,19 @@ def plot_translational_ramp_speed_comparison(data, other:bool=False):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
+    time = column(data, "dt")
 
-    ramp_speed = [d.translational_ramp_speed for d in data]
-    estimated_speed = [d.translational_speed_estimation for d in data]
-    other_estimated_speed = [d.translational_speed_estimation_2 for d in data]
+    ramp_speed = column(data, "translational_ramp_speed")
+    estimated_speed = column(data, "translational_speed_estimation")
 
-    time_bis = [data[i].dt for i in range(len(data)-1)]
-    speed = [(data[i+1].translational_position - data[i].translational_position)/data[i].robot_dt for i in range(len(data)-1)]
+    time_bis = time[:-1]
+    speed = derivative(column(data, "translational_position"), column(data, "robot_dt"))
     plt.figure()
     plt.plot(time_bis, speed, label="Translational Ramp Speed raw derivative (mm/s)")
     plt.plot(time, ramp_speed, label="Ramp Speed (mm/s)")
     plt.plot(time, estimated_speed, label="Estimated Speed (mm/s)")
     if other:
-        plt.plot(time, other_estimated_speed, label="Other Estimated Speed (mm/s)")
+        plt.plot(time, column(data, "translational_speed_estimation_2"), label="Other Estimated Speed (mm/s)")
     plt.xlabel("Time (s)")
     plt.ylabel("Speed (mm/s)")
     plt.title("Comparison of Translational Speeds")
@@ -78,11 +112,11 @@ def plot_rotational_tracking(data):
         return
 
     # Use d.dt (accumulated time) as x-axis
-    time = [d.dt for d in data]
+    time = column(data, "dt")
 
     # Extract rotational target and position
-    target = [d.rotational_target_deg for d in data]
-    position = [d.rotational_position_deg for d in data]
+    target = column(data, "rotational_target_deg")
+    position = column(data, "rotational_position_deg")
 
     plt.figure()
     plt.plot(time, target, label="Rotational Target (deg)")
@@ -99,8 +133,8 @@ def plot_error(data):
     if not data:
         print("No data to plot.")
         return
-    time = [d.dt for d in data]
-    error = [(d.translational_target - d.translational_position) for d in data]
+    time = column(data, "dt")
+    error = column(data, "translational_target") - column(data, "translational_position")
     plt.figure()
     plt.plot(time, error, label="Position error (mm)")
     plt.xlabel("Time (s)")
@@ -115,8 +149,8 @@ def plot_error_speed(data):
     if not data:
         print("No data to plot.")
         return
-    time = [data[i].dt for i in range(len(data)-1)]
-    speed = [(data[i+1].translational_position - data[i].translational_position)/data[i].robot_dt for i in range(len(data)-1)]
+    time = column(data, "dt")[:-1]
+    speed = derivative(column(data, "translational_position"), column(data, "robot_dt"))
     plt.figure()
     plt.plot(time, speed, label="Speed of translational (mm/s)")
     plt.xlabel("Time (s)")
@@ -130,11 +164,11 @@ def plot_error_speed_vs_pll(data):
     if not data:
         print("No data to plot.")
         return
-    time = [data[i].dt for i in range(len(data)-1)]
-    time2 = [d.dt for d in data]
-    speed = [(data[i+1].rotational_position_deg - data[i].rotational_position_deg)/data[i].robot_dt for i in range(len(data)-1)]
-    ramp_speed = [d.ramp_speed_deg for d in data]
-    estimated_speed = [d.estimated_speed_deg for d in data]
+    time2 = column(data, "dt")
+    time = time2[:-1]
+    speed = derivative(column(data, "rotational_position_deg"), column(data, "robot_dt"))
+    ramp_speed = column(data, "ramp_speed_deg")
+    estimated_speed = column(data, "estimated_speed_deg")
     plt.figure()
     plt.plot(time2, ramp_speed, label="Ramp Speed (deg/s)")
     plt.plot(time2, estimated_speed, label="Estimated Speed (deg/s)")
@@ -151,12 +185,10 @@ def do_fft(data, fct):
     if not data:
         print("No data to plot.")
         return
-    error_signal = np.array([
-        fct(d) for d in data
-    ])
+    error_signal = values_of(data, fct)
 
     # Compute sample rate from average robot_dt (in Hz)
-    dt_samples = np.array([d.robot_dt for d in data])
+    dt_samples = column(data, "robot_dt")
     avg_dt = np.mean(dt_samples)
     fs = 1.0 / avg_dt  # sample frequency in Hz
     n = len(error_signal)
@@ -181,8 +213,8 @@ def plot_trajectory(data):
         print("No data to plot.")
         return
 
-    x = [d.current_x for d in data]
-    y = [d.current_y for d in data]
+    x = column(data, "current_x")
+    y = column(data, "current_y")
 
     plt.figure()
     plt.plot(x, y, marker='o')
@@ -198,9 +230,9 @@ def plot_combined_errors(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    angle_errors = [d.current_error_angle for d in data]
-    dist_errors = [d.current_error_distance for d in data]
+    time = column(data, "dt")
+    angle_errors = column(data, "current_error_angle")
+    dist_errors = column(data, "current_error_distance")
 
     plt.figure()
     plt.plot(time, dist_errors, label="Distance Error (mm)")
@@ -217,8 +249,8 @@ def plot_current_error(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    current_errors = [d.current_error for d in data]
+    time = column(data, "dt")
+    current_errors = column(data, "current_error")
 
     plt.figure()
     plt.plot(time, current_errors, label="Error |mm|")
@@ -234,9 +266,9 @@ def plot_heading_vs_target_heading(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    target = [d.rotational_target_deg for d in data]
-    actual = [d.rotational_position_deg for d in data]
+    time = column(data, "dt")
+    target = column(data, "rotational_target_deg")
+    actual = column(data, "rotational_position_deg")
 
     plt.figure()
     plt.plot(time, target, label="Target Heading (deg)")
@@ -253,8 +285,8 @@ def plot_heading_error(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    error = [d.rotational_target_deg - d.rotational_position_deg for d in data]  # already in degrees
+    time = column(data, "dt")
+    error = column(data, "rotational_target_deg") - column(data, "rotational_position_deg")  # already in degrees
 
     plt.figure()
     plt.plot(time, error, label="Heading Error (deg)")
@@ -270,11 +302,8 @@ def plot_rotational_speed(data):
         print("Not enough data to compute speed.")
         return
 
-    time = [data[i].dt for i in range(len(data) - 1)]
-    speed = [
-        (data[i+1].rotational_position_deg - data[i].rotational_position_deg) / data[i].robot_dt
-        for i in range(len(data) - 1)
-    ]
+    time = column(data, "dt")[:-1]
+    speed = derivative(column(data, "rotational_position_deg"), column(data, "robot_dt"))
 
     plt.figure()
     plt.plot(time, speed, label="Rotational Speed (deg/s)")
@@ -290,12 +319,8 @@ def plot_acceleration(data):
         print("Not enough data to compute acceleration.")
         return
 
-    time = [data[i].dt for i in range(1, len(data)-1)]
-    acceleration = [
-        (data[i+1].translational_position - 2 * data[i].translational_position + data[i-1].translational_position)
-        / (data[i].robot_dt ** 2)
-        for i in range(1, len(data)-1)
-    ]
+    time = column(data, "dt")[1:-1]
+    acceleration = second_derivative(column(data, "translational_position"), column(data, "robot_dt"))
 
     plt.figure()
     plt.plot(time, acceleration, label="Translational Acceleration (mm/s²)")
@@ -311,11 +336,11 @@ def plot_rotational_tracking_with_pwm(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    target = [d.rotational_target_deg for d in data]
-    position = [d.rotational_position_deg for d in data]
-    left_pwm = [d.left_pwm for d in data]
-    right_pwm = [d.right_pwm for d in data]
+    time = column(data, "dt")
+    target = column(data, "rotational_target_deg")
+    position = column(data, "rotational_position_deg")
+    left_pwm = column(data, "left_pwm")
+    right_pwm = column(data, "right_pwm")
 
     plt.figure()
     plt.plot(time, target, label="Target (deg)")
@@ -338,11 +363,11 @@ def plot_translational_tracking_with_pwm(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    target = [d.translational_target for d in data]
-    position = [d.translational_position for d in data]
-    left_pwm = [d.left_pwm for d in data]
-    right_pwm = [d.right_pwm for d in data]
+    time = column(data, "dt")
+    target = column(data, "translational_target")
+    position = column(data, "translational_position")
+    left_pwm = column(data, "left_pwm")
+    right_pwm = column(data, "right_pwm")
 
     plt.figure()
     plt.plot(time, target, label="Target")
@@ -365,9 +390,9 @@ def plot_pwm(data):
         print("No data to plot.")
         return
     plt.figure()
-    time = [d.dt for d in data]
-    plt.plot(time, [d.left_pwm for d in data], label="Left PWM")
-    plt.plot(time, [d.right_pwm for d in data], label="Right PWM")
+    time = column(data, "dt")
+    plt.plot(time, column(data, "left_pwm"), label="Left PWM")
+    plt.plot(time, column(data, "right_pwm"), label="Right PWM")
     plt.xlabel("Time (s)")
     plt.ylabel("PWM Value")
     plt.title("Motor PWM Outputs (Angle)")
@@ -380,9 +405,9 @@ def plot_ramp_vs_estimated_speed(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    ramp_speed = [d.ramp_speed_deg for d in data]
-    estimated_speed = [d.estimated_speed_deg for d in data]
+    time = column(data, "dt")
+    ramp_speed = column(data, "ramp_speed_deg")
+    estimated_speed = column(data, "estimated_speed_deg")
 
     plt.figure()
     plt.plot(time, ramp_speed, label="Ramp Speed (deg/s)")
@@ -395,16 +420,55 @@ def plot_ramp_vs_estimated_speed(data):
     plt.tight_layout()
     plt.show(block=True)
 
+def plot_lock_in_amplitude(data):
+    """FFT of the speed error, overlaid with the amplitude of its oscillation found by lock-in demodulation."""
+    freq, spec, mag = do_fft(data, lambda d: (d.estimated_speed_deg - d.ramp_speed_deg))
+
+    sampling_rate = 1.0/(np.average(column(data, "robot_dt")))
+
+    index_target = np.argmin(np.abs(freq - 2.0))
+
+
+    f_osc_index = index_target + np.argmax(mag[index_target:])
+    f_osc = freq[f_osc_index]
+    ref_sin = np.sin(2 * np.pi * f_osc * column(data, "dt"))
+    ref_cos = np.cos(2 * np.pi * f_osc * column(data, "dt"))
+    s = column(data, "ramp_speed_deg") - column(data, "estimated_speed_deg")
+    s -= np.mean(s)
+    i_component = 2 * s * ref_cos  # In-phase
+    q_component = 2 * s * ref_sin  # Quadrature
+    # Apply low-pass filter to get amplitude envelope
+    from scipy.signal import butter, sosfiltfilt
+
+    sos = butter(2, f_osc * 2 / (sampling_rate / 2), output='sos')
+    i_filtered = sosfiltfilt(sos, i_component)
+    q_filtered = sosfiltfilt(sos, q_component)
+
+    amplitude_envelope = np.sqrt(i_filtered ** 2 + q_filtered ** 2)
+    time = column(data, "dt")
+    plt.plot(time, s, label="Speed Error")
+    plt.plot(time, amplitude_envelope, label="Amplitude Envelope", linewidth=2)
+    plt.legend()
+    plt.title("Lock-in Demodulated Oscillation Amplitude")
+    plt.show(block=True)
+    mean_amp = np.mean(amplitude_envelope)
+    sigma = np.std(amplitude_envelope)  # you can also set this manually
+
+    weights = np.exp(-((amplitude_envelope - mean_amp) ** 2) / (2 * sigma ** 2))
+    weighted_mean = np.sum(weights * amplitude_envelope) / np.sum(weights)
+    print(weighted_mean)
+    return weighted_mean
+
 def plot_pos_target(data, type="deg"):
     if not data:
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
+    time = column(data, "dt")
 
     plt.figure()
-    plt.plot(time, [d.position for d in data], label="Position")
-    plt.plot(time, [d.target for d in data], label="Target")
+    plt.plot(time, column(data, "position"), label="Position")
+    plt.plot(time, column(data, "target"), label="Target")
     plt.xlabel("Time (s)")
     plt.ylabel(f"Error ({type})")
     plt.title("Position vs Target Over Time")
@@ -418,8 +482,8 @@ def plot_speed_error(data, type="deg"):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    error = [d.ramp_speed - d.estimated_speed for d in data]
+    time = column(data, "dt")
+    error = column(data, "ramp_speed") - column(data, "estimated_speed")
 
     plt.figure()
     plt.plot(time, error, label="Speed Error (Ramp - Estimated)")
@@ -436,8 +500,8 @@ def plot_speed_angle_error(data):
         print("No data to plot.")
         return
 
-    time = [d.dt for d in data]
-    error = [d.ramp_speed_deg - d.estimated_speed_deg for d in data]
+    time = column(data, "dt")
+    error = column(data, "ramp_speed_deg") - column(data, "estimated_speed_deg")
 
     plt.figure()
     plt.plot(time, error, label="Speed Error (Ramp - Estimated)")
@@ -452,11 +516,11 @@ def plot_up_ui_ud(data):
     if not data:
         print("No data to plot.")
         return
-    time = [d.dt for d in data]
+    time = column(data, "dt")
     plt.figure()
-    plt.plot(time, [d.up for d in data], label="UP")
-    plt.plot(time, [d.ui for d in data], label="UI")
-    plt.plot(time, [d.ud for d in data], label="UD")
+    plt.plot(time, column(data, "up"), label="UP")
+    plt.plot(time, column(data, "ui"), label="UI")
+    plt.plot(time, column(data, "ud"), label="UD")
     plt.title("PWM result")
     plt.legend()
     plt.grid(True)
@@ -466,12 +530,12 @@ def plot_up_ui_ud_uff(data):
     if not data:
         print("No data to plot.")
         return
-    time = [d.dt for d in data]
+    time = column(data, "dt")
     plt.figure()
-    plt.plot(time, [d.up for d in data], label="UP")
-    plt.plot(time, [d.ui for d in data], label="UI")
-    plt.plot(time, [d.ud for d in data], label="UD")
-    plt.plot(time, [d.uff for d in data], label="UFF")
+    plt.plot(time, column(data, "up"), label="UP")
+    plt.plot(time, column(data, "ui"), label="UI")
+    plt.plot(time, column(data, "ud"), label="UD")
+    plt.plot(time, column(data, "uff"), label="UFF")
     plt.title("PWM result")
     plt.legend()
     plt.grid(True)
@@ -482,17 +546,18 @@ def plot_xy_trajectory(data):
         print("No data to plot.")
         return
 
-    actual_x = [d.x for d in data]
-    actual_y = [d.y for d in data]
-    target_x = [d.target_x for d in data]
-    target_y = [d.target_y for d in data]
+    actual_x = column(data, "x")
+    actual_y = column(data, "y")
+    target_x = column(data, "target_x")
+    target_y = column(data, "target_y")
 
     plt.figure()
     plt.plot(actual_x, actual_y, label="Actual Path")
     plt.plot(target_x, target_y, label="Target Path")
+    time = column(data, "dt")
     for i in range(0, len(data), 200):
-        plt.text(actual_x[i], actual_y[i], f'{data[i].dt:.1f}', fontsize=8, ha='right')
-        plt.text(target_x[i], target_y[i], f'{data[i].dt:.1f}', fontsize=8, ha='right')
+        plt.text(actual_x[i], actual_y[i], f'{time[i]:.1f}', fontsize=8, ha='right')
+        plt.text(target_x[i], target_y[i], f'{time[i]:.1f}', fontsize=8, ha='right')
     plt.xlabel("X position (mm)")
     plt.ylabel("Y position (mm)")
     plt.title("2D Trajectory Tracking")
@@ -505,7 +570,7 @@ def plot_robot_dt(data):
     if not data:
         print("No data to plot.")
     plt.figure()
-    plt.plot([d.robot_dt for d in data], label="Robot DT")
+    plt.plot(column(data, "robot_dt"), label="Robot DT")
     plt.xlabel("Tick")
     plt.ylabel("DT Value")
     plt.legend()
@@ -517,8 +582,8 @@ def plot_raw_ud_distance(data):
     if not data:
         print("No data to plot.")
     plt.figure()
-    plt.plot([d.dt for d in data], [d.raw_ud for d in data], label="Robot raw ud")
-    plt.plot([d.dt for d in data], [d.ud for d in data], label="Robot ud")
+    plt.plot(column(data, "dt"), column(data, "raw_ud"), label="Robot raw ud")
+    plt.plot(column(data, "dt"), column(data, "ud"), label="Robot ud")
     plt.xlabel("t(sec)")
     plt.ylabel("PWM Signal")
     plt.legend()
@@ -530,8 +595,8 @@ def plot_raw_ud_angle(data):
     if not data:
         print("No data to plot.")
     plt.figure()
-    plt.plot([d.dt for d in data], [d.raw_ud_angle for d in data], label="Robot raw ud")
-    plt.plot([d.dt for d in data], [d.ud_angle for d in data], label="Robot ud")
+    plt.plot(column(data, "dt"), column(data, "raw_ud_angle"), label="Robot raw ud")
+    plt.plot(column(data, "dt"), column(data, "ud_angle"), label="Robot ud")
     plt.xlabel("t(sec)")
     plt.ylabel("PWM Signal")
     plt.legend()
@@ -544,7 +609,7 @@ def plot_a(data):
     if not data:
         print("No data to plot.")
     plt.figure()
-    plt.plot([d.dt for d in data], [d.a for d in data], label="Angular orientation")
+    plt.plot(column(data, "dt"), column(data, "a"), label="Angular orientation")
     plt.xlabel("t(sec)")
     plt.ylabel("Orientation (deg)")
     plt.legend()
@@ -556,7 +621,7 @@ def plot_variable(data, get_variable, title=None, ylabel=None):
     if not data:
         print("No data to plot.")
     plt.figure()
-    plt.plot([d.dt for d in data], [get_variable(d) for d in data])
+    plt.plot(column(data, "dt"), values_of(data, get_variable))
     plt.xlabel("t(sec)")
     if ylabel is not None:
         plt.ylabel(ylabel)
@@ -0,0 +1,131 @@
+import functools
+import hashlib
+import importlib
+import json
+import os
+
+MANIFEST_NAME = "report.json"
+HASH_BLOCK = 1024 ** 2
+# Modules whose code decides what the report figures look like, decoding included
+PLOTTING_MODULES = [
+    "data.BenchmarkFile",
+    "data.VersionAndClasses",
+    "data.Parser",
+    "data.PlottingFunctions",
+    "data.Decimation",
+    "data.CompleteParserClasses",
+    "data.Controllers",
+    "data.SubControllers",
+    "file_opener",
+]
+
+
+def file_hash(filename) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as f:
+        while data := f.read(HASH_BLOCK):
+            h.update(data)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_hash(modules=tuple(PLOTTING_MODULES)) -> str:
+    """Hash of the source of the plotting modules, any edit to them makes every figure stale.
+
+    There is no per-figure spec, editing one plot renders every report again.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for name in modules:
+        with open(importlib.import_module(name).__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class ReportManifest:
+    """Build manifest of the report directory of one benchmark file.
+
+    For every figure it keeps the hash of the input file, the hash of the code (spec) that
+    drew it and its output path, so a report is only rendered again when one of them changed
+    or the PNG went missing. selection is None once the whole report was rendered, otherwise
+    the names of the selections rendered so far.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        try:
+            with open(self.path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {"input": {}, "figures": {}, "selection": []}
+
+    def input_hash(self, filename) -> str:
+        """Content hash of filename, only recomputed when its size or mtime changed."""
+        stat = os.stat(filename)
+        known = self.data["input"]
+        if known.get("size") == stat.st_size and known.get("mtime") == stat.st_mtime and "hash" in known:
+            return known["hash"]
+        return file_hash(filename)
+
+    def figures(self) -> dict:
+        return self.data["figures"]
+
+    def covers(self, figures) -> bool:
+        """Whether the recorded figures were rendered for a selection including figures, None is all."""
+        # Manifests written before selections were recorded may only hold part of the report
+        selection = self.data.get("selection", [])
+        if selection is None:
+            return True
+        if figures is None:
+            return False
+        return all(any(name == s or name.startswith(s + ".") for s in selection) for name in figures)
+
+    def changed(self, filename, spec) -> bool:
+        """Whether the input or the spec of a recorded figure changed since it was drawn."""
+        digest = self.input_hash(filename)
+        return any(figure["input"] != digest or figure["spec"] != spec for figure in self.data["figures"].values())
+
+    def missing(self) -> list[str]:
+        """Recorded figures whose output file is gone."""
+        return [name for name, figure in self.data["figures"].items()
+                if not os.path.exists(os.path.join(self.directory, figure["path"]))]
+
+    def stale(self, filename, spec) -> list[str]:
+        """Recorded figures to draw again."""
+        if self.changed(filename, spec):
+            return list(self.data["figures"])
+        return self.missing()
+
+    def up_to_date(self, filename, spec) -> bool:
+        return bool(self.data["figures"]) and not self.stale(filename, spec)
+
+    def update(self, filename, spec, outputs: dict[str, str], replace=True, selection=None):
+        """Record the figures just saved, outputs maps a figure name to its file in the directory.
+
+        With replace the outputs are the whole report, figures it no longer has are deleted.
+        Otherwise they were drawn for the names of selection, added to the recorded ones.
+        """
+        stat = os.stat(filename)
+        digest = self.input_hash(filename)
+        self.data["input"] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": digest}
+        if replace:
+            if os.path.exists(self.path):
+                previous = [figure["path"] for figure in self.data["figures"].values()]
+            else:
+                # Directory rendered before manifests existed, its images are all ours
+                previous = [name for name in os.listdir(self.directory) if name.endswith(".png")]
+            for path in previous:
+                if path not in outputs.values():
+                    try:
+                        os.remove(os.path.join(self.directory, path))
+                    except OSError:
+                        pass
+            self.data["figures"] = {}
+            self.data["selection"] = None
+        elif self.data.get("selection", []) is not None:
+            self.data["selection"] = sorted(set(self.data.get("selection", [])) | set(selection or ()))
+        for name, path in outputs.items():
+            self.data["figures"][name] = {"input": digest, "spec": spec, "path": path}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp, self.path)
@@ -1,10 +1,11 @@
 import struct
 from dataclasses import dataclass, fields
 from typing import Optional, Type
-import matplotlib.pyplot as plt
+from data.LazyModule import LazyModule
+plt = LazyModule("matplotlib.pyplot")
 import copy
-from data.Parser import ParsableClass, plot_variable, show_plots, get_all_field_paths, set_field_by_path, \
-    get_field_by_path
+from data.Parser import ParsableClass, FigureSelection, child_records, plot_variable, show_plots, \
+    get_all_field_paths, set_field_by_path, get_field_by_path
 
 sub_controller_types = [
 ]
@@ -22,10 +23,10 @@ class SubController(ParsableClass):
         return ParsableClass.generate(a, data)
 
     @staticmethod
-    def display_data(results):
-        SubController.show(results)
+    def display_data(results, figures=None):
+        SubController.show(results, figures=figures)
     @staticmethod
-    def show(results, str=""):
+    def show(results, str="", figures=None):
         raise Exception("Not implemented")
 
 
@@ -36,21 +37,23 @@ class SubControllerPID(SubController):
     ud: Optional[float] = None
 
     @staticmethod
-    def display_data(results):
-        SubControllerPID.show(results)
+    def display_data(results, figures=None):
+        SubControllerPID.show(results, figures=figures)
     @staticmethod
-    def show(results, str=""):
-        current_figure = plt.gcf()
-        plot_variable(results, "up", label="K_p contribution", title=f"Contributions of each term of the PID {str if str!= "" else "controller"}", ylabel="d.c")
-        plot_variable(results, "ui", label="K_i contribution")
-        plot_variable(results, "ud", label="K_d contribution")
-        plt.figure()
-        plot_variable(results, "up", label="K_p contribution", title=f"Contribution of K_p in d.c. {("for the " + str) if str != "" else ""}")
-        plt.figure()
-        plot_variable(results, "ui", label="K_i contribution", title=f"Contribution of K_i in d.c. {("for the " + str) if str != "" else ""}")
-        plt.figure()
-        plot_variable(results, "ud", label="K_d contribution", title=f"Contribution of K_d in d.c. {("for the " + str) if str != "" else ""}")
-        plt.figure(current_figure)
+    def show(results, str="", figures=None):
+        figures = FigureSelection.of(figures)
+        if figures.figure("contributions"):
+            plot_variable(results, "up", label="K_p contribution", title=f"Contributions of each term of the PID {str if str!= "" else "controller"}", ylabel="d.c")
+            plot_variable(results, "ui", label="K_i contribution")
+            plot_variable(results, "ud", label="K_d contribution")
+        if figures.figure("kp"):
+            plot_variable(results, "up", label="K_p contribution", title=f"Contribution of K_p in d.c. {("for the " + str) if str != "" else ""}")
+        if figures.figure("ki"):
+            plot_variable(results, "ui", label="K_i contribution", title=f"Contribution of K_i in d.c. {("for the " + str) if str != "" else ""}")
+        if figures.figure("kd"):
+            plot_variable(results, "ud", label="K_d contribution", title=f"Contribution of K_d in d.c. {("for the " + str) if str != "" else ""}")
+        # The contributions figure is left current, as the figure callers used to hand in
+        figures.figure("contributions")
 
 
 
@@ -59,16 +62,17 @@ class SubControllerPIDSpeedFeedForward(SubControllerPID):
     uff: Optional[float] = None
 
     @staticmethod
-    def display_data(results):
-        SubControllerPIDSpeedFeedForward.show(results)
+    def display_data(results, figures=None):
+        SubControllerPIDSpeedFeedForward.show(results, figures=figures)
     @staticmethod
-    def show(results, str=""):
-        SubControllerPID.show(results, str)
-        current_figure = plt.gcf()
-        plot_variable(results, "uff", label="Feed forward contribution")
-        plt.figure()
-        plot_variable(results, "uff", label="Feed forward contribution", title=f"Contribution of the feed forward in d.c. {("for the " + str) if str != "" else ""}")
-        plt.figure(current_figure)
+    def show(results, str="", figures=None):
+        figures = FigureSelection.of(figures)
+        SubControllerPID.show(results, str, figures)
+        if figures.figure("contributions"):
+            plot_variable(results, "uff", label="Feed forward contribution")
+        if figures.figure("speed_feed_forward"):
+            plot_variable(results, "uff", label="Feed forward contribution", title=f"Contribution of the feed forward in d.c. {("for the " + str) if str != "" else ""}")
+        figures.figure("contributions")
 
 
 @dataclass
@@ -76,34 +80,35 @@ class SubControllerPIDFilteredD(SubControllerPID):
     rawUd: Optional[float] = None
 
     @staticmethod
-    def display_data(results):
-        SubControllerPIDFilteredD.show(results)
+    def display_data(results, figures=None):
+        SubControllerPIDFilteredD.show(results, figures=figures)
     @staticmethod
-    def show(results, str=""):
-        SubControllerPID.show(results, str)
-        current_figure = plt.gcf()
-        plot_variable(results, "rawUd", label="Raw K_d contribution")
-        plt.figure()
-        plot_variable(results, "rawUd", label="Raw K_d contribution", title=f"Contribution of Raw K_d in d.c. {("for the " + str) if str != "" else ""}")
-        plt.figure(current_figure)
+    def show(results, str="", figures=None):
+        figures = FigureSelection.of(figures)
+        SubControllerPID.show(results, str, figures)
+        if figures.figure("contributions"):
+            plot_variable(results, "rawUd", label="Raw K_d contribution")
+        if figures.figure("raw_kd"):
+            plot_variable(results, "rawUd", label="Raw K_d contribution", title=f"Contribution of Raw K_d in d.c. {("for the " + str) if str != "" else ""}")
+        figures.figure("contributions")
 
 @dataclass
 class SubControllerFeedForward(SubController):
     innerSubController: Optional[SubController] = None
     uff: Optional[float] = None
     @staticmethod
-    def display_data(results):
-        SubControllerFeedForward.show(results)
+    def display_data(results, figures=None):
+        SubControllerFeedForward.show(results, figures=figures)
     @staticmethod
-    def show(results, str=""):
-        for c in results:
-            c.innerSubController.dt = c.dt
-        type(results[0].innerSubController).show([r.innerSubController for r in results], str)
-        current_figure = plt.gcf()
-        plot_variable(results, "uff", label="Feed forward contribution")
-        plt.figure()
-        plot_variable(results, "uff", label="Feed forward contribution", title=f"Contribution of the feed forward in d.c. {("for the " + str) if str != "" else ""}")
-        plt.figure(current_figure)
+    def show(results, str="", figures=None):
+        figures = FigureSelection.of(figures)
+        inner = child_records(results, "innerSubController")
+        type(inner[0]).show(inner, str, figures)
+        if figures.figure("contributions"):
+            plot_variable(results, "uff", label="Feed forward contribution")
+        if figures.figure("feed_forward"):
+            plot_variable(results, "uff", label="Feed forward contribution", title=f"Contribution of the feed forward in d.c. {("for the " + str) if str != "" else ""}")
+        figures.figure("contributions")
 
 
 
@@ -1,8 +1,13 @@
 import dataclasses
+import functools
 import struct
 from itertools import accumulate
+from typing import Any
+
+import numpy as np
 
 from data.CompleteParserClasses import *
+from data.Parser import CustomParser, ParsableClass, ParsableLayout, decode_columns
 from data.CurveBenchmarkClasses import *
 from data.ZieglerNicholsClasses import ZieglerNicholsParser
 
@@ -237,21 +242,123 @@ class DistanceSpeedData:
         values = struct.unpack('>7d', data)
         return DistanceSpeedData(*values)
 
+class LegacyDecoder:
+    """Precompiled decoder of a fixed-layout legacy record class (versions 0-9).
+
+    The stored fields are the first get_length() // 8 of the dataclass, one struct.Struct and
+    one NumPy dtype are compiled for them so whole bodies can be decoded at once.
+    """
+    def __init__(self, dataclass_type):
+        self.dataclass_type = dataclass_type
+        self.fields = [field.name for field in dataclasses.fields(dataclass_type)][:dataclass_type.get_length() // 8]
+        self.struct = struct.Struct(f'>{len(self.fields)}d')
+        self.dtype = np.dtype([(name, '>f8') for name in self.fields])
+        self.needs_dt_accumulation = getattr(dataclass_type, "needs_dt_accumulation", False)
+
+    def get_length(self):
+        return self.struct.size
+
+    def from_bytes(self, data):
+        if len(data) < self.get_length():
+            raise ValueError(f'Not enough bytes to unpack {self.dataclass_type.__name__} (need {self.get_length()} bytes)')
+        return self.dataclass_type(*self.struct.unpack(data))
+
+    def iter_from_bytes(self, data):
+        """Dataclass of every complete record of data, a trailing partial record is ignored."""
+        complete = len(data) - len(data) % self.get_length()
+        for values in self.struct.iter_unpack(memoryview(data)[:complete]):
+            yield self.dataclass_type(*values)
+
+    def columns_from_bytes(self, data) -> dict[str, np.ndarray]:
+        return decode_columns(data, self.dtype)
+
+
+@dataclasses.dataclass(frozen=True)
+class Schema:
+    """Layout descriptor of one benchmark version.
+
+    header_bytes is the number of subversion bytes following the version, target the class
+    decoding a record: a legacy dataclass, a CustomParser or a ParsableClass. Legacy targets
+    can depend on the subversion through a dict.
+    """
+    name: str
+    target: Any
+    header_bytes: int = 0
+
+    def is_parsable(self):
+        return isinstance(self.target, type) and issubclass(self.target, ParsableClass)
+
+
+schemas = {
+    0: Schema("BENCHMARK_LEGACY_ANGLE", AngleData),
+    1: Schema("BENCHMARK_LEGACY_DISTANCE", DistanceData),
+    2: Schema("BENCHMARK_LEGACY_DISTANCE_ANGLE", DistanceAngleData),
+    3: Schema("BENCHMARK_ANGLE_V_0_1", AngleSpeedComparisonData),
+    4: Schema("BENCHMARK_DISTANCE_V_0_1", {1: DistanceDataPID, 2: DistanceDataPIDSpeedFF, 3: DistanceDataSuperBase}, 1),
+    5: Schema("BENCHMARK_DISTANCE_ANGLE_V_0_1", BenchmarkDistanceAngleV01),
+    6: Schema("Z_N_LEGACY_ANGLE", ZieglerNicholsParser),
+    7: Schema("Z_N_LEGACY_DISTANCE", DistancePWMData),
+    8: Schema("Z_N_LEGACY_ANGLE_SPEED", AngleSpeedData),
+    9: Schema("Z_N_LEGACY_DISTANCE_SPEED", DistanceSpeedData),
+    10: Schema("BENCHMARK_LEGACY_CURVE", CurveBenchmarkParser, 2),
+    11: Schema("BENCHMARK_CURVE_V_0_1", CurveBenchmarkParserV01, 2),
+    12: Schema("BENCHMARK_ANGLE_V_0_2", BenchmarkAngleV02),
+    13: Schema("BENCHMARK_DISTANCE_V_0_2", BenchmarkDistanceV02),
+    14: Schema("UNIVERSAL_BENCHMARK_V_0_1", UniversalBenchmarkV01),
+}
+
+# Former version table, kept for scripts indexing it directly
 versions = [
-    AngleData,                   # 0: BENCHMARK_LEGACY_ANGLE
-    DistanceData,                # 1: BENCHMARK_LEGACY_DISTANCE
-    DistanceAngleData,           # 2: BENCHMARK_LEGACY_DISTANCE_ANGLE
-    AngleSpeedComparisonData,    # 3: BENCHMARK_ANGLE_V_0_1
-    [None, DistanceDataPID, DistanceDataPIDSpeedFF, DistanceDataSuperBase], # 4: BENCHMARK_DISTANCE_V_0_1
-    BenchmarkDistanceAngleV01,           # 5: BENCHMARK_DISTANCE_ANGLE_V_0_1
-    ZieglerNicholsParser,                # 6: Z_N_LEGACY_ANGLE
-    DistancePWMData,             # 7: Z_N_LEGACY_DISTANCE
-    AngleSpeedData,              # 8: Z_N_LEGACY_ANGLE_SPEED
-    DistanceSpeedData,           # 9: Z_N_LEGACY_DISTANCE_SPEED
-    CurveBenchmarkParser,        # 10 : BENCHMARK_LEGACY_CURVE
-    CurveBenchmarkParserV01,      # 11 : BENCHMARK_CURVE_V_0_1
-    BenchmarkAngleV02,
-    BenchmarkDistanceV02,
-    UniversalBenchmarkV01
-
-]
\ No newline at end of file
+    [schema.target.get(i) for i in range(max(schema.target) + 1)] if isinstance(schema.target, dict) else schema.target
+    for _, schema in sorted(schemas.items())
+]
+
+
+@functools.lru_cache(maxsize=None)
+def compile_decoder(version, subversion=None, subsubversion=None):
+    """Record decoder of a non ParsableClass header tuple, compiled once and shared."""
+    target = schemas[version].target
+    if isinstance(target, dict):
+        target = target[subversion]
+    if issubclass(target, CustomParser):
+        return target(subversion or 0, subsubversion or 0)
+    return LegacyDecoder(target)
+
+
+class RecordingReader:
+    """File wrapper keeping every byte read through it."""
+    def __init__(self, f):
+        self.f = f
+        self.consumed = b""
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.consumed += data
+        return data
+
+
+# version -> [(controller type bytes, layout)] of the controller trees met so far
+compiled_layouts = {}
+CONTROLLER_PEEK = 64
+
+
+def read_parsable_layout(f, version) -> ParsableLayout:
+    """Consume the controller type bytes of a ParsableClass file and return its compiled layout.
+
+    generate only runs the first time a controller tree is met, later files with the same
+    type bytes reuse its layout.
+    """
+    start = f.tell()
+    peek = f.read(CONTROLLER_PEEK)
+    for consumed, layout in compiled_layouts.get(version, []):
+        if peek.startswith(consumed):
+            f.seek(start + len(consumed))
+            return layout
+    f.seek(start)
+    reader = RecordingReader(f)
+    template = schemas[version].target()
+    template.generate(template, reader)
+    template.update()
+    layout = template.compile_layout()
+    compiled_layouts.setdefault(version, []).append((reader.consumed, layout))
+    return layout
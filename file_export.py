@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+from data.BenchmarkFile import read_header, record_dtype, iter_columns, open_binary, log_stem
+from data.Parser import CompleteParser
+from file_index import controller_tree, record_class_name
+
+NPY_HEADER_LENGTH = 128
+SCHEMA_NAME = "schema.json"
+
+
+def npy_header(count) -> bytes:
+    """Header of a 1-D little-endian float64 .npy file, always NPY_HEADER_LENGTH bytes long.
+
+    The fixed length lets the record count be written once the stream is done.
+    """
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d,), }" % count
+    header = header.ljust(NPY_HEADER_LENGTH - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def write_schema(output_dir, filename, header, names, count, files):
+    schema = {
+        "source": os.path.abspath(filename),
+        "version": header.version,
+        "subversion": header.subversion,
+        "subsubversion": header.subsubversion,
+        "class": record_class_name(header.class_type),
+        "records": count,
+        "columns": names,
+        "files": files,
+    }
+    if isinstance(header.class_type, CompleteParser):
+        schema["controllers"] = controller_tree(header.class_type.data_type)
+    with open(os.path.join(output_dir, SCHEMA_NAME), "w") as f:
+        json.dump(schema, f, indent=2)
+    return schema
+
+
+def export_npy(filename, output_dir, chunk_records=65536):
+    """Convert a benchmark file into output_dir/<column>.npy plus schema.json.
+
+    The body is streamed chunk_records at a time, controller fields keep their dotted path.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    count = 0
+    with open_binary(filename) as f:
+        header = read_header(f)
+        try:
+            for block in iter_columns(f, header, chunk_records):
+                if not outputs:
+                    for name in block:
+                        outputs[name] = open(os.path.join(output_dir, f"{name}.npy"), "wb")
+                        outputs[name].write(npy_header(0))
+                for name, column in block.items():
+                    outputs[name].write(column.astype('<f8').tobytes())
+                count += len(block["robot_dt"])
+            if not outputs:
+                for name in record_dtype(header.class_type).names:
+                    outputs[name] = open(os.path.join(output_dir, f"{name}.npy"), "wb")
+            for output in outputs.values():
+                output.seek(0)
+                output.write(npy_header(count))
+        finally:
+            for output in outputs.values():
+                output.close()
+    files = {name: f"{name}.npy" for name in outputs}
+    return write_schema(output_dir, filename, header, list(outputs), count, files)
+
+
+def export_csv(filename, output_dir, chunk_records=65536, rows_per_file=1_000_000):
+    """Convert a benchmark file into CSV parts of about rows_per_file rows plus schema.json."""
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    names = []
+    count = 0
+    output = None
+    rows_in_part = 0
+    with open_binary(filename) as f:
+        header = read_header(f)
+        try:
+            for block in iter_columns(f, header, chunk_records):
+                names = list(block)
+                if output is None or rows_in_part >= rows_per_file:
+                    if output is not None:
+                        output.close()
+                    files.append(f"part_{len(files):05d}.csv")
+                    output = open(os.path.join(output_dir, files[-1]), "w")
+                    output.write(",".join(names) + "\n")
+                    rows_in_part = 0
+                np.savetxt(output, np.column_stack(list(block.values())), fmt="%.17g", delimiter=",")
+                rows_in_part += len(block["robot_dt"])
+                count += len(block["robot_dt"])
+        finally:
+            if output is not None:
+                output.close()
+    return write_schema(output_dir, filename, header, names, count, files)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export benchmark .bin files to column stores")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("-o", "--output", default="export", help="output directory, one sub directory per file")
+    parser.add_argument("--csv", action="store_true", help="write chunked CSV instead of .npy columns")
+    parser.add_argument("--chunk", type=int, default=65536, help="records decoded per block")
+    args = parser.parse_args()
+    for filename in args.files:
+        output_dir = os.path.join(args.output, log_stem(os.path.basename(filename)))
+        if args.csv:
+            schema = export_csv(filename, output_dir, args.chunk)
+        else:
+            schema = export_npy(filename, output_dir, args.chunk)
+        print(f"{filename} -> {output_dir} ({schema['records']} records, {len(schema['columns'])} columns)")
@@ -0,0 +1,135 @@
+import argparse
+
+import numpy as np
+
+from data.BenchmarkWriter import BenchmarkWriter, encode_header
+from data.CompleteParserClasses import BenchmarkDistanceAngleV01, BenchmarkAngleV02, BenchmarkDistanceV02, \
+    UniversalBenchmarkV01
+from data.Controllers import TripleBasicController
+from data.SubControllers import SubControllerPID, SubControllerPIDFilteredD, SubControllerFeedForward
+from data.VersionAndClasses import compile_decoder
+
+ROBOT_PERIOD = 0.005
+TRACKING_LAG = 0.05
+# Subversions used when none is given, the richest record of each format
+default_subversions = {
+    4: (1, None),
+    10: (3, 3),
+    11: (3, 3),
+}
+
+
+def default_template(version):
+    """Controller tree of the ParsableClass formats, like the ones found on the test bench."""
+    if version == 5:
+        return BenchmarkDistanceAngleV01(controllerDistance=SubControllerPID(), controllerAngle=SubControllerPID())
+    if version == 12:
+        return BenchmarkAngleV02(controller=SubControllerFeedForward(innerSubController=SubControllerPIDFilteredD()))
+    if version == 13:
+        return BenchmarkDistanceV02(controller=SubControllerPID())
+    if version == 14:
+        return UniversalBenchmarkV01(controller=TripleBasicController(
+            SubControllerFeedForward(innerSubController=SubControllerPIDFilteredD()),
+            SubControllerPID(),
+            SubControllerPID(),
+        ))
+    return None
+
+
+def resolve_format(version, subversion=None, subsubversion=None, template=None):
+    if subversion is None and subsubversion is None:
+        subversion, subsubversion = default_subversions.get(version, (None, None))
+    return subversion, subsubversion, template or default_template(version)
+
+
+class SyntheticSignals:
+    """Smooth telemetry for any record layout, reproducible from its seed.
+
+    Every channel is a sum of slow sinusoids plus a little noise, a *position* channel lags
+    behind its *target* and the time base follows a jittered robot period, so the output
+    compresses and plots like a real log. Blocks continue each other.
+    """
+    def __init__(self, names, seed=0):
+        self.names = names
+        self.rng = np.random.default_rng(seed)
+        self.parameters = {}
+        for name in names:
+            scale = 10.0 ** self.rng.uniform(0, 3)
+            self.parameters[name] = (
+                scale * self.rng.uniform(0.2, 1.0, 3),
+                self.rng.uniform(0.01, 2.0, 3),
+                self.rng.uniform(0, 2 * np.pi, 3),
+                scale * 1e-3,
+            )
+        self.time = 0.0
+
+    def signal(self, name, t):
+        amplitudes, frequencies, phases, noise = self.parameters[name]
+        values = np.zeros_like(t)
+        for amplitude, frequency, phase in zip(amplitudes, frequencies, phases):
+            values += amplitude * np.sin(2 * np.pi * frequency * t + phase)
+        return values + self.rng.normal(0, noise, len(t))
+
+    def columns(self, count) -> dict[str, np.ndarray]:
+        robot_dt = ROBOT_PERIOD * (1 + self.rng.normal(0, 0.01, count))
+        t = self.time + np.cumsum(robot_dt)
+        self.time = t[-1]
+        columns = {}
+        for name in self.names:
+            target = name.replace("position", "target")
+            if name == "robot_dt":
+                columns[name] = robot_dt
+            elif name == "dt":
+                columns[name] = t
+            elif target != name and target in self.parameters:
+                columns[name] = self.signal(target, t - TRACKING_LAG)
+            else:
+                columns[name] = self.signal(name, t)
+        return columns
+
+
+def generate_log(filename, version, records, subversion=None, subsubversion=None, template=None, seed=0,
+                 chunk_records=65536):
+    """Write a synthetic benchmark file of the given format with records records, chunk by chunk."""
+    subversion, subsubversion, template = resolve_format(version, subversion, subsubversion, template)
+    with BenchmarkWriter(filename, version, subversion, subsubversion, template) as writer:
+        signals = SyntheticSignals(writer.names, seed)
+        for start in range(0, records, chunk_records):
+            writer.write_columns(signals.columns(min(chunk_records, records - start)))
+    return writer
+
+
+def records_for_size(size, version, subversion=None, subsubversion=None, template=None):
+    """Number of records giving a file of about size bytes."""
+    subversion, subsubversion, template = resolve_format(version, subversion, subsubversion, template)
+    header = encode_header(version, subversion, subsubversion, template)
+    if template is not None:
+        itemsize = template.compile_layout().get_length()
+    else:
+        itemsize = compile_decoder(version, subversion, subsubversion).get_length()
+    return max(0, (size - len(header)) // itemsize)
+
+
+def parse_size(text) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark .bin files")
+    parser.add_argument("output", help="output file, .gz/.xz/.bz2 to compress it")
+    parser.add_argument("--version", type=int, default=14)
+    parser.add_argument("--subversion", type=int)
+    parser.add_argument("--subsubversion", type=int)
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--records", type=int)
+    size.add_argument("--size", type=parse_size, help="approximate file size, e.g. 500M or 2G")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    records = args.records
+    if records is None:
+        records = records_for_size(args.size, args.version, args.subversion, args.subsubversion)
+    writer = generate_log(args.output, args.version, records, args.subversion, args.subsubversion, seed=args.seed)
+    print(f"{args.output}: v{args.version} {writer.count} records of {writer.dtype.itemsize} bytes")
@@ -0,0 +1,118 @@
+import dataclasses
+import json
+import lzma
+import os
+import struct
+import sys
+import zlib
+
+from data.BenchmarkFile import MappedBenchmarkFile, read_header, record_dtype, iter_columns, open_binary, \
+    is_compressed, find_logs
+from data.Parser import CompleteParser, ParsableClass
+
+INDEX_NAME = "index.json"
+DT_SAMPLE = 256
+
+
+def controller_tree(obj, prefix=""):
+    """Class of every generated controller of a ParsableClass tree, by field path."""
+    tree = {}
+    for field in dataclasses.fields(obj):
+        value = getattr(obj, field.name)
+        if isinstance(value, ParsableClass):
+            path = f"{prefix}{field.name}"
+            tree[path] = type(value).__name__
+            tree.update(controller_tree(value, prefix=path + "."))
+    return tree
+
+
+def record_class_name(class_type) -> str:
+    if isinstance(class_type, CompleteParser):
+        return type(class_type.data_type).__name__
+    return class_type.dataclass_type.__name__
+
+
+def describe_header(header) -> dict:
+    class_type = header.class_type
+    schema = {
+        "version": header.version,
+        "subversion": header.subversion,
+        "subsubversion": header.subsubversion,
+        "class": record_class_name(class_type),
+        "columns": list(record_dtype(class_type).names),
+    }
+    if isinstance(class_type, CompleteParser):
+        schema["controllers"] = controller_tree(class_type.data_type)
+    return schema
+
+
+def index_entry(filename) -> dict:
+    """Describe a benchmark file from its header and size only, the body is never read.
+
+    Compressed files have no usable size, their body is streamed once to count the records.
+    """
+    if is_compressed(filename):
+        with open_binary(filename) as f:
+            header = read_header(f)
+            count = 0
+            duration = 0.0
+            for block in iter_columns(f, header):
+                count += len(block["robot_dt"])
+                if "dt" in block:
+                    duration = float(block["dt"][-1])
+    else:
+        mapped = MappedBenchmarkFile(filename)
+        header = mapped.header
+        names = mapped.dtype.names
+        count = len(mapped)
+        duration = 0.0
+        if count:
+            if "dt" in names and not getattr(header.class_type, "needs_dt_accumulation", False):
+                duration = float(mapped.records["dt"][-1])
+            if duration == 0.0:
+                duration = float(mapped.records["robot_dt"][:DT_SAMPLE].astype(float).mean() * count)
+    stat = os.stat(filename)
+    return {
+        "schema": describe_header(header),
+        "records": count,
+        "duration": duration,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+
+
+def index_directory(directory, output=None) -> dict:
+    """Index every .bin file of directory, compressed ones included, into directory/index.json.
+
+    Entries whose size and mtime did not change are reused from the previous index.
+    """
+    output = output or os.path.join(directory, INDEX_NAME)
+    previous = {}
+    if os.path.exists(output):
+        with open(output) as f:
+            previous = json.load(f).get("files", {})
+    files = {}
+    for filename in find_logs(directory):
+        name = os.path.relpath(filename, directory)
+        stat = os.stat(filename)
+        entry = previous.get(name)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            try:
+                entry = index_entry(filename)
+            except (ValueError, IndexError, struct.error, EOFError, OSError, zlib.error, lzma.LZMAError) as e:
+                # Truncated or corrupt logs must not stop the scan of the others
+                print(f"Skipping {filename}: {e}")
+                continue
+        files[name] = entry
+    index = {"files": files}
+    with open(output, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    return index
+
+
+if __name__ == "__main__":
+    for directory in sys.argv[1:] or ["data_bin"]:
+        index = index_directory(directory)
+        for name, entry in index["files"].items():
+            schema = entry["schema"]
+            print(f"{name}: v{schema['version']} {schema['class']} {entry['records']} records {entry['duration']:.1f}s")
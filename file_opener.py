@@ -1,218 +1,364 @@
+import glob
 import struct
 
+import numpy as np
+
+from data.BenchmarkFile import read_header, read_columns, read_frame, iter_columns, record_dtype, frame_of_columns, \
+    MappedBenchmarkFile, BenchmarkFollower, TimeBase, follow, open_binary, is_compressed, log_stem, \
+    version_with_subversion, version_with_subsubversion
+from data.BenchmarkDataset import BenchmarkDataset, BenchmarkRun
+from data.BenchmarkFrame import BenchmarkFrame
+from data.BenchmarkStats import ingest_stats, load_stats
+from data.ColumnCache import ColumnCache, default_cache, content_key
+from data.ReportManifest import ReportManifest, code_hash
 from data.Parser import *
 from data.PlottingFunctions import *
+from data import PlottingFunctions as plotting
 from data.VersionAndClasses import *
 import os
-version_with_subversion = [4, 10,11]
-version_with_subsubversion = [10,11]
-def open_file(filename, display=False):
-    version = None
-    subVersion = None
-    subsubVersion = None
+def open_file(filename, display=False, columnar=False, cache=default_cache, stats=True, incremental=False,
+              figures=None, skip_up_to_date=False):
+    """Decode filename, with display build its report figures and save them next to it.
+
+    figures selects the figures by name, None builds them all. With incremental only the
+    figures whose PNG went missing are built again, none if the input and code are unchanged
+    and an earlier render covered the selection. skip_up_to_date then does not even decode
+    the file and returns None.
+
+    cache and stats are only used by the columnar decode, the records are always parsed from
+    the file.
+    """
     result = []
-    class_type = None
     done = True
-    with open(filename, "rb") as f:
-        if class_type is None:
-            data = f.read(8)
-            if(len(data) != 8):
-                raise ValueError("Version of Benchmark not found")
-            version = struct.unpack('>Q', data)[0]
-            print("Version =", version)
-            if(version in version_with_subversion):
-                data = f.read(1)
-                if(len(data) != 1):
-                    raise ValueError("Subversion of Benchmark not found")
-                subVersion = struct.unpack('>B', data)[0]
-                if(version in version_with_subsubversion):
-                    data = f.read(1)
-                    if (len(data) != 1):
-                        raise ValueError("Subsubversion of Benchmark not found")
-                    subsubVersion = struct.unpack('>B', data)[0]
-                    class_type = versions[version]
-                    if isinstance(class_type, type) and issubclass(class_type, CustomParser):
-                        class_type = class_type(subVersion, subsubVersion)
-                    else:
-                        class_type = class_type[subVersion][subsubVersion]
-                else:
-                    print(version, subVersion)
-                    class_type = versions[version][subVersion]
+    figures = FigureSelection(figures)
+    if display and incremental:
+        manifest = ReportManifest(log_stem(filename))
+        if manifest.figures() and manifest.covers(figures.figures) and not manifest.changed(filename, code_hash()):
+            missing = [name for name in manifest.missing() if figures.selected(name)]
+            if not missing:
+                print(f"Report of {filename} is up to date")
+                if skip_up_to_date:
+                    return None
+                display = False
             else:
-                class_type = versions[version]
-                if isinstance(class_type, type) and issubclass(class_type, CustomParser):
-                    class_type = class_type(0,0)
-                elif isinstance(class_type, type) and issubclass(class_type, ParsableClass):
-                    class_type = CompleteParser(f, class_type())
-                    result = class_type.get_result()
-                    if display:
-                        class_type.display()
-                print(version, subVersion)
-
-        if not issubclass(type(class_type), CompleteParser):
-            while data := f.read(class_type.get_length()):
+                figures = FigureSelection(missing)
+    with open_binary(filename) as f:
+        header = read_header(f)
+        version = header.version
+        subVersion = header.subversion
+        class_type = header.class_type
+        print("Version =", version)
+        print(version, subVersion)
+        if columnar:
+            result = cache.load(filename, class_type) if cache is not None else None
+            if result is None:
+                result = read_frame(f, header)
+                if stats:
+                    ingest_stats(filename, result)
+                if cache is not None:
+                    try:
+                        cache.store(filename, result)
+                    except OSError as e:
+                        print(f"Could not cache {filename}: {e}")
+            elif display and isinstance(class_type, CompleteParser):
+                values = np.array([result[path] for path in class_type.layout.paths])
+                class_type.results = ParsedRecords(class_type.layout, values)
+            if display and isinstance(class_type, CompleteParser):
+                class_type.display(figures)
+        elif isinstance(class_type, CompleteParser):
+            result = class_type.get_result()
+            if display:
+                class_type.display(figures)
+        elif isinstance(class_type, LegacyDecoder):
+            body = f.read()
+            result = list(class_type.iter_from_bytes(body))
+            if len(body) % class_type.get_length():
+                done = False
+                print("Value error")
+        else:
+            body = f.read()
+            length = class_type.get_length()
+            for start in range(0, len(body), length):
                 try:
-                    result.append(class_type.from_bytes(data))
+                    result.append(class_type.from_bytes(body[start:start + length]))
                 except ValueError:
                     done = False
                     print("Value error")
                     break
                 print(result[-1])
 
-    if all(getattr(d, 'dt', 0.0) == 0.0 for d in result):
+    if isinstance(result, ParsedRecords):
+        if not result.column("dt").any():
+            result.column("dt")[:] = np.cumsum(result.column("robot_dt"))
+    elif not columnar and all(getattr(d, 'dt', 0.0) == 0.0 for d in result):
         dts = list(accumulate(d.robot_dt for d in result))
         for obj, dt in zip(result, dts):
             obj.dt = dt
     if display:
+        frame = result
+        if done and not columnar and not isinstance(class_type, CompleteParser):
+            # The plots read whole columns, decoded at once from the body the records came from
+            frame = frame_of_columns(class_type.columns_from_bytes(body), class_type)
         if not done:
             print("issue")
         elif version == 0:
-            plot_rotational_tracking(result)
-            plot_heading_error(result)
-            plot_rotational_speed(result)
-            do_fft(result, lambda d: (d.rotational_target_deg - d.rotational_position_deg))
+            figures.draw("rotational_tracking", plot_rotational_tracking, frame)
+            figures.draw("heading_error", plot_heading_error, frame)
+            figures.draw("rotational_speed", plot_rotational_speed, frame)
+            figures.draw("fft", do_fft, frame, lambda d: (d.rotational_target_deg - d.rotational_position_deg))
 
         elif version == 1:
-            plot_translational_tracking(result)
-            plot_error(result)
-            plot_error_speed(result)
-            plot_acceleration(result)
-            do_fft(result, lambda d: (d.translational_target - d.translational_position))
+            figures.draw("translational_tracking", plot_translational_tracking, frame)
+            figures.draw("translational_error", plot_error, frame)
+            figures.draw("translational_speed", plot_error_speed, frame)
+            figures.draw("acceleration", plot_acceleration, frame)
+            figures.draw("fft", do_fft, frame, lambda d: (d.translational_target - d.translational_position))
 
         elif version == 2:
-            plot_translational_tracking(result)
-            plot_rotational_tracking(result)
-            plot_trajectory(result)
-            plot_combined_errors(result)
-            plot_heading_vs_target_heading(result)
-            plot_error(result)
-            plot_error_speed(result)
+            figures.draw("translational_tracking", plot_translational_tracking, frame)
+            figures.draw("rotational_tracking", plot_rotational_tracking, frame)
+            figures.draw("trajectory", plot_trajectory, frame)
+            figures.draw("combined_errors", plot_combined_errors, frame)
+            figures.draw("heading", plot_heading_vs_target_heading, frame)
+            figures.draw("translational_error", plot_error, frame)
+            figures.draw("translational_speed", plot_error_speed, frame)
         elif version == 3:
-            plot_rotational_tracking(result)
-            plot_heading_error(result)
-            plot_rotational_speed_comparison(result)
-            plot_rotational_speed(result)
-            plot_error_speed_vs_pll(result)
-            do_fft(result, lambda d: (d.rotational_target_deg - d.rotational_position_deg))
+            figures.draw("rotational_tracking", plot_rotational_tracking, frame)
+            figures.draw("heading_error", plot_heading_error, frame)
+            figures.draw("rotational_speed_comparison", plot_rotational_speed_comparison, frame)
+            figures.draw("rotational_speed", plot_rotational_speed, frame)
+            figures.draw("rotational_speed_pll", plot_error_speed_vs_pll, frame)
+            figures.draw("fft", do_fft, frame, lambda d: (d.rotational_target_deg - d.rotational_position_deg))
         elif version == 4:
-            plot_translational_tracking(result)
-            plot_error(result)
-            plot_error_speed(result)
-            plot_acceleration(result)
-            plot_pwm(result)
+            figures.draw("translational_tracking", plot_translational_tracking, frame)
+            figures.draw("translational_error", plot_error, frame)
+            figures.draw("translational_speed", plot_error_speed, frame)
+            figures.draw("acceleration", plot_acceleration, frame)
+            figures.draw("pwm", plot_pwm, frame)
             if subVersion == 1:
-                plot_up_ui_ud(result)
+                figures.draw("pid_terms", plot_up_ui_ud, frame)
             elif subVersion == 2 :
-                plot_up_ui_ud_uff(result)
-            do_fft(result, lambda d: (d.translational_target - d.translational_position))
-            do_fft(result, lambda d: (d.ud))
+                figures.draw("pid_terms", plot_up_ui_ud_uff, frame)
+            figures.draw("fft", do_fft, frame, lambda d: (d.translational_target - d.translational_position))
+            figures.draw("ud_fft", do_fft, frame, lambda d: (d.ud))
         elif version == 6:  # Z_N_LEGACY_ANGLE
-            plot_pwm(result)
-            plot_speed_error(result)
-            plot_pos_target(result)
+            figures.draw("pwm", plot_pwm, frame)
+            figures.draw("speed_error", plot_speed_error, frame)
+            figures.draw("position_target", plot_pos_target, frame)
 
         elif version == 7:  # Z_N_LEGACY_DISTANCE
-            plot_translational_tracking_with_pwm(result)
-            plot_error(result)
-            plot_error_speed(result)
-            plot_acceleration(result)
+            figures.draw("translational_tracking", plot_translational_tracking_with_pwm, frame)
+            figures.draw("translational_error", plot_error, frame)
+            figures.draw("translational_speed", plot_error_speed, frame)
+            figures.draw("acceleration", plot_acceleration, frame)
         elif version == 8:  # Z_N_LEGACY_ANGLE_SPEED
-            plot_heading_vs_target_heading(result)
-            plot_pwm(result)
-            plot_ramp_vs_estimated_speed(result)
-            plot_speed_angle_error(result)
-            freq, spec, mag = do_fft(result, lambda d: (d.estimated_speed_deg - d.ramp_speed_deg))
-
-            sampling_rate = 1.0/(np.average([d.robot_dt for d in result]))
-
-            index_target = np.argmin(np.abs(freq - 2.0))
-
-
-            f_osc_index = index_target + np.argmax(mag[index_target:])
-            f_osc = freq[f_osc_index]
-            ref_sin = np.sin(2 * np.pi * f_osc * np.array([d.dt for d in result]))
-            ref_cos = np.cos(2 * np.pi * f_osc * np.array([d.dt for d in result]))
-            s = np.array([(d.ramp_speed_deg - d.estimated_speed_deg) for d in result])
-            s -= np.mean(s)
-            i_component = 2 * s * ref_cos  # In-phase
-            q_component = 2 * s * ref_sin  # Quadrature
-            # Apply low-pass filter to get amplitude envelope
-            from scipy.signal import butter, filtfilt
-
-            from scipy.signal import butter, sosfiltfilt
-
-            sos = butter(2, f_osc * 2 / (sampling_rate / 2), output='sos')
-            i_filtered = sosfiltfilt(sos, i_component)
-            q_filtered = sosfiltfilt(sos, q_component)
-
-            amplitude_envelope = np.sqrt(i_filtered ** 2 + q_filtered ** 2)
-            time = np.array([d.dt for d in result])
-            plt.plot(time, s, label="Speed Error")
-            plt.plot(time, amplitude_envelope, label="Amplitude Envelope", linewidth=2)
-            plt.legend()
-            plt.title("Lock-in Demodulated Oscillation Amplitude")
-            plt.show(block=True)
-            mean_amp = np.mean(amplitude_envelope)
-            sigma = np.std(amplitude_envelope)  # you can also set this manually
-
-            weights = np.exp(-((amplitude_envelope - mean_amp) ** 2) / (2 * sigma ** 2))
-            weighted_mean = np.sum(weights * amplitude_envelope) / np.sum(weights)
-            print(weighted_mean)
-
+            figures.draw("heading", plot_heading_vs_target_heading, frame)
+            figures.draw("pwm", plot_pwm, frame)
+            figures.draw("speed", plot_ramp_vs_estimated_speed, frame)
+            figures.draw("speed_error", plot_speed_angle_error, frame)
+            figures.draw("lock_in", plot_lock_in_amplitude, frame)
 
         elif version == 9:  # Z_N_LEGACY_DISTANCE_SPEED
-            plot_translational_tracking(result)
-            plot_error_speed(result)
-            plot_acceleration(result)
-            plot_pwm(result)
+            figures.draw("translational_tracking", plot_translational_tracking, frame)
+            figures.draw("translational_speed", plot_error_speed, frame)
+            figures.draw("acceleration", plot_acceleration, frame)
+            figures.draw("pwm", plot_pwm, frame)
 
         elif version == 10:
-            #plot_rotational_tracking(result)
-            plot_error_speed(result)
-            plot_acceleration(result)
-            plot_pwm(result)
-            plot_up_ui_ud(result)
-            plot_robot_dt(result)
-            plot_xy_trajectory(result)
-            plot_current_error(result)
-            if result[0].raw_ud is not None:
-                plot_raw_ud_distance(result)
-            if result[0].raw_ud_angle is not None:
-                plot_raw_ud_angle(result)
-            if result[0].a is not None:
-                plot_a(result)
+            #plot_rotational_tracking(frame)
+            figures.draw("translational_speed", plot_error_speed, frame)
+            figures.draw("acceleration", plot_acceleration, frame)
+            figures.draw("pwm", plot_pwm, frame)
+            figures.draw("pid_terms", plot_up_ui_ud, frame)
+            figures.draw("robot_dt", plot_robot_dt, frame)
+            figures.draw("trajectory", plot_xy_trajectory, frame)
+            figures.draw("current_error", plot_current_error, frame)
+            if frame.raw_ud is not None:
+                figures.draw("raw_ud_distance", plot_raw_ud_distance, frame)
+            if frame.raw_ud_angle is not None:
+                figures.draw("raw_ud_angle", plot_raw_ud_angle, frame)
+            if frame.a is not None:
+                figures.draw("orientation", plot_a, frame)
         elif version == 11:
-            #plot_rotational_tracking(result)
-            #plot_error_speed(result)
-            plot_translational_ramp_speed_comparison(result, other=False)
-            plot_acceleration(result)
-            plot_pwm(result)
-            plot_up_ui_ud(result)
-            plot_robot_dt(result)
-            plot_xy_trajectory(result)
-            plot_current_error(result)
-            if result[0].raw_ud is not None:
-                plot_raw_ud_distance(result)
-            if result[0].raw_ud_angle is not None:
-                plot_raw_ud_angle(result)
-            if result[0].a is not None:
-                plot_a(result)
-            plot_variable(result, lambda x: x.rotational_position_deg, ylabel="Rotational Position(deg)", title="Rotational Position in function of time")
-            plot_variable(result, lambda x: x.rotational_target_deg, ylabel="Rotational Target(deg)", title="Rotational Target in function of time")
-            plot_variable(result, lambda x: x.rotational_target_deg - x.rotational_position_deg)
-            plot_rotational_tracking(result)
-            plot_translational_tracking(result)
+            #plot_rotational_tracking(frame)
+            #plot_error_speed(frame)
+            figures.draw("translational_speed", plot_translational_ramp_speed_comparison, frame, other=False)
+            figures.draw("acceleration", plot_acceleration, frame)
+            figures.draw("pwm", plot_pwm, frame)
+            figures.draw("pid_terms", plot_up_ui_ud, frame)
+            figures.draw("robot_dt", plot_robot_dt, frame)
+            figures.draw("trajectory", plot_xy_trajectory, frame)
+            figures.draw("current_error", plot_current_error, frame)
+            if frame.raw_ud is not None:
+                figures.draw("raw_ud_distance", plot_raw_ud_distance, frame)
+            if frame.raw_ud_angle is not None:
+                figures.draw("raw_ud_angle", plot_raw_ud_angle, frame)
+            if frame.a is not None:
+                figures.draw("orientation", plot_a, frame)
+            figures.draw("rotational_position", plotting.plot_variable, frame, lambda x: x.rotational_position_deg, ylabel="Rotational Position(deg)", title="Rotational Position in function of time")
+            figures.draw("rotational_target", plotting.plot_variable, frame, lambda x: x.rotational_target_deg, ylabel="Rotational Target(deg)", title="Rotational Target in function of time")
+            figures.draw("rotational_error", plotting.plot_variable, frame, lambda x: x.rotational_target_deg - x.rotational_position_deg)
+            figures.draw("rotational_tracking", plot_rotational_tracking, frame)
+            figures.draw("translational_tracking", plot_translational_tracking, frame)
 
         print("Number of figures ", plt.get_fignums())
         if(plt.get_fignums() != []):
-            import shutil
-            shutil.rmtree(filename.replace(".bin", ""), True)
-            os.makedirs(f"{filename.replace(".bin", "")}")
+            os.makedirs(log_stem(filename), exist_ok=True)
+        outputs = {}
         for i in plt.get_fignums():
             fig = plt.figure(i)
             ax = plt.gca()  # get current axes
             title = ax.get_title() if ax.get_title() else f"figure_{i}"
             safe_title = title.replace(" ", "_")
-            fig.savefig(f"{filename.replace(".bin", "")}/{safe_title}.png")   # or .pdf/.svg etc.
+            fig.savefig(f"{log_stem(filename)}/{safe_title}.png")   # or .pdf/.svg etc.
+            outputs[fig.get_label() or safe_title] = f"{safe_title}.png"
             plt.close(fig)
-    return result
\ No newline at end of file
+        if outputs:
+            # A selection only refreshes its own figures, the rest of the report is kept
+            ReportManifest(log_stem(filename)).update(filename, code_hash(), outputs,
+                                                      replace=figures.figures is None, selection=figures.figures)
+    return result
+
+def read_window(filename, t0, t1, cache=default_cache) -> BenchmarkFrame:
+    """Records of filename whose dt lies in [t0, t1], found by binary search over the time base.
+
+    Only that slice is decoded: from the cached columns when the file was opened columnar
+    before, otherwise from the memory mapped body with a cached cumulative time index.
+    """
+    if is_compressed(filename):
+        # No random access into a compressed body, it is streamed and only the overlapping blocks kept
+        with open_binary(filename) as f:
+            header = read_header(f)
+            blocks = [block for block in iter_columns(f, header) if block["dt"][0] <= t1 and block["dt"][-1] >= t0]
+        names = list(dict.fromkeys(record_dtype(header.class_type).names + ("dt",)))
+        columns = {name: np.concatenate([block[name] for block in blocks] or [np.empty(0)]) for name in names}
+        optional = [name for name in getattr(header.class_type, "ALL_FIELDS", []) if name not in columns]
+        frame = BenchmarkFrame(columns, optional, header.class_type)
+        return frame[np.searchsorted(frame.dt, t0, 'left'):np.searchsorted(frame.dt, t1, 'right')]
+    mapped = MappedBenchmarkFile(filename)
+    frame = cache.load(filename, mapped.header.class_type) if cache is not None else None
+    if frame is not None:
+        return frame[np.searchsorted(frame.dt, t0, 'left'):np.searchsorted(frame.dt, t1, 'right')]
+    times = cache.load_time_index(filename) if cache is not None else None
+    if times is None:
+        times = mapped.time_base()
+        if cache is not None:
+            try:
+                cache.store_time_index(filename, times)
+            except OSError as e:
+                print(f"Could not cache the time index of {filename}: {e}")
+    return mapped.window(np.searchsorted(times, t0, 'left'), np.searchsorted(times, t1, 'right'), times)
+
+def open_file_columns(filename):
+    """Decode a whole file at once into one float64 array per field (dotted paths for controller trees)."""
+    with open_binary(filename) as f:
+        return read_columns(f, read_header(f))
+
+def iter_file(filename, chunk_records=65536):
+    """Yield the records of filename as column blocks of at most chunk_records records.
+
+    Only one block is held in memory at a time and dt keeps accumulating across blocks,
+    so reductions can run over logs of any size.
+    """
+    with open_binary(filename) as f:
+        yield from iter_columns(f, read_header(f), chunk_records)
+
+def _decode_for_many(filename, cache, stats, keep):
+    """Worker of open_many, the columns go back through the cache when there is one."""
+    if cache is not None and cache.load(filename) is not None:
+        return None
+    with open_binary(filename) as f:
+        frame = read_frame(f, read_header(f))
+    if stats:
+        ingest_stats(filename, frame)
+    if cache is not None:
+        try:
+            cache.store(filename, frame, keep)
+            return None
+        except OSError:
+            pass
+    return frame.columns, frame.optional
+
+def open_many(paths, workers=None, cache=default_cache, stats=True):
+    """Decode many files in parallel over a process pool, frames are returned in the order of paths.
+
+    With a cache the workers only write the decoded columns to it and the frames are memory
+    mapped from there, otherwise the float64 arrays are sent back as is. Entries of the batch
+    are not evicted before they are mapped, a file missing from the cache is decoded here.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = list(paths)
+    keep = frozenset(content_key(filename) for filename in paths) if cache is not None else frozenset()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_decode_for_many, paths, [cache] * len(paths), [stats] * len(paths),
+                                    [keep] * len(paths)))
+    frames = []
+    for filename, result in zip(paths, results):
+        with open_binary(filename) as f:
+            header = read_header(f)
+            if result is None:
+                frame = cache.load(filename, header.class_type)
+                if frame is None:
+                    # Removed by another process meanwhile
+                    frame = read_frame(f, header)
+                frames.append(frame)
+            else:
+                columns, optional = result
+                frames.append(BenchmarkFrame(columns, optional, header.class_type))
+    if cache is not None:
+        # Mapped frames outlive the removal of their files, the batch can now be evicted as usual
+        cache.evict()
+    return frames
+
+def _render_report(filename, force, figures):
+    """Worker of render_reports: build and save the report figures of filename on the Agg backend."""
+    import contextlib
+    import time
+    import warnings
+    import matplotlib
+    matplotlib.use("Agg")
+    matplotlib.rcParams["figure.max_open_warning"] = 0
+    # plt.show() is a no-op on Agg, the plotting helpers no longer block
+    warnings.filterwarnings("ignore", "FigureCanvasAgg is non-interactive")
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            open_file(filename, display=True, incremental=not force, figures=figures, skip_up_to_date=True)
+    finally:
+        # Workers are reused, figures left open by a failed report would end up in the next one
+        plt.close("all")
+    paths = {figure["path"] for figure in ReportManifest(log_stem(filename)).figures().values()}
+    return len(paths), time.perf_counter() - start
+
+def render_reports(paths, workers=None, force=False, figures=None):
+    """Render the report figures of many files headless, one file per worker process.
+
+    Reports whose input and plotting code did not change since their last render are kept
+    unless force is set, figures selects the figures by name as in open_file. Progress is
+    printed as files complete, the figure count of every file is returned.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    paths = list(paths)
+    results = {}
+    # spawn so workers never inherit a GUI backend already loaded by the caller
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(_render_report, filename, force, figures): filename for filename in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            filename = futures[future]
+            try:
+                results[filename], seconds = future.result()
+                print(f"[{done}/{len(paths)}] {filename}: {results[filename]} figures in {seconds:.1f}s")
+            except Exception as e:
+                results[filename] = None
+                print(f"[{done}/{len(paths)}] {filename}: failed ({type(e).__name__}: {e})")
+    return results
+
+def open_dataset(files, cache=default_cache):
+    """Virtual dataset over a glob pattern or a list of files, the runs are only decoded when queried."""
+    if isinstance(files, str):
+        files = sorted(glob.glob(files))
+    return BenchmarkDataset(files, cache)
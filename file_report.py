@@ -0,0 +1,25 @@
+import argparse
+import os
+import time
+
+from data.BenchmarkFile import find_logs
+from file_opener import render_reports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the report figures of benchmark files headless")
+    parser.add_argument("paths", nargs="*", default=["data_bin"], help="files or directories")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--force", action="store_true", help="render every report even when it is up to date")
+    parser.add_argument("-f", "--figures", nargs="+", help="figure names to render, like trajectory or controller.kp")
+    args = parser.parse_args()
+    filenames = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            filenames.extend(find_logs(path))
+        else:
+            filenames.append(path)
+    start = time.perf_counter()
+    results = render_reports(filenames, args.workers, args.force, args.figures)
+    failed = [filename for filename, figures in results.items() if figures is None]
+    print(f"{len(filenames) - len(failed)} reports, {sum(f or 0 for f in results.values())} figures "
+          f"in {time.perf_counter() - start:.1f}s, {len(failed)} failed")
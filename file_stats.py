@@ -0,0 +1,61 @@
+import argparse
+import os
+
+from data.BenchmarkFile import find_logs
+from data.BenchmarkStats import load_stats
+
+
+def column_extreme(stats, words, key, reduce):
+    values = [column[key] for name, column in stats["columns"].items() if any(word in name.lower() for word in words)]
+    return reduce(values) if values else None
+
+
+def summary_row(filename) -> dict:
+    """Headline numbers of one run, read from its statistics sidecar."""
+    stats = load_stats(filename)
+    columns = stats["columns"]
+    tracking = stats["tracking"]
+    return {
+        "file": os.path.basename(filename),
+        "records": stats["records"],
+        "duration": stats["duration"],
+        "final_error": columns["error"]["last"] if "error" in columns else None,
+        "max_tracking_error": max((t["max_abs_error"] for t in tracking.values()), default=None),
+        "iae": sum(t["iae"] for t in tracking.values()) if tracking else None,
+        "mean_robot_dt": columns["robot_dt"]["mean"] if "robot_dt" in columns else None,
+        "max_robot_dt": columns["robot_dt"]["max"] if "robot_dt" in columns else None,
+        "pwm_min": column_extreme(stats, ("pwm", "motor"), "min", min),
+        "pwm_max": column_extreme(stats, ("pwm", "motor"), "max", max),
+    }
+
+
+def summary_table(filenames) -> list[dict]:
+    """summary_row of every file, sidecars are only computed for new or changed files."""
+    return [summary_row(filename) for filename in filenames]
+
+
+def format_value(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summary table of benchmark runs from their statistics sidecars")
+    parser.add_argument("paths", nargs="*", default=["data_bin"], help="files or directories")
+    args = parser.parse_args()
+    filenames = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            filenames.extend(find_logs(path))
+        else:
+            filenames.append(path)
+    rows = summary_table(filenames)
+    if rows:
+        keys = list(rows[0])
+        table = [keys] + [[format_value(row[key]) for key in keys] for row in rows]
+        widths = [max(len(line[i]) for line in table) for i in range(len(keys))]
+        for line in table:
+            print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
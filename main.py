@@ -20,11 +20,11 @@ from file_opener import *
 
 filename = "data_rapport_v2/BenchmarkControllerANGLEESCTuned.bin"
 
-bc_esc_angle = open_file(filename, False)
-bc_zn_angle = open_file("data_rapport_v2/BenchmarkControllerANGLEZNTuned.bin", False)
+bc_esc_angle = open_file(filename, False, columnar=True)
+bc_zn_angle = open_file("data_rapport_v2/BenchmarkControllerANGLEZNTuned.bin", False, columnar=True)
 
-bc_esc_distance = open_file("data_rapport_v2/BenchmarkControllerDistanceFullESC.bin", False)
-bc_zn_distance = open_file("data_rapport_v2/BenchmarkControllerDistanceWithoutDFilterAndFF.bin", False)
+bc_esc_distance = open_file("data_rapport_v2/BenchmarkControllerDistanceFullESC.bin", False, columnar=True)
+bc_zn_distance = open_file("data_rapport_v2/BenchmarkControllerDistanceWithoutDFilterAndFF.bin", False, columnar=True)
 
 plt.figure()
 plot_variable_fct(bc_esc_angle, lambda x: x.rotational_target - x.rotational_position, ylabel="Rotational Error(deg)", title="Rotational Error in function of time", label="ESC Tuned")
@@ -175,18 +175,19 @@ def create_animation_carrot(states, carrot_states, filename, custom_pad_x=None,
         ani.save(gif_path, writer="pillow", progress_callback=_progress)
 
 
-bc_zn_angle = open_file("BenchmarkCurve1751138133.bin", False)
+bc_zn_angle = open_file("BenchmarkCurve1751138133.bin", False, columnar=True)
+zeros = np.zeros(len(bc_zn_angle))
 
-states = np.array([(r.x, r.y, r.a/180*np.pi) for r in bc_zn_angle])
-carrot_states = np.array([(r.target_x, r.target_y) for r in bc_zn_angle])
+states = np.column_stack((bc_zn_angle.x, bc_zn_angle.y, bc_zn_angle.a/180*np.pi))
+carrot_states = np.column_stack((bc_zn_angle.target_x, bc_zn_angle.target_y))
 carrot_states -= states[:, 0:2]
 states[:, 0:2] = 0
 create_animation_carrot(states, carrot_states, filename="ShowCurveEvolution")
 
-states = np.array([(r.dt, r.rotational_target_deg, 0) for r in bc_zn_angle])
+states = np.column_stack((bc_zn_angle.dt, bc_zn_angle.rotational_target_deg, zeros))
 create_animation(states, filename="RampRotationalTarget", show_robot=False, custom_pad_x=0.5, custom_pad_y=100, aspect_equal=False, mp4=True)
 
-states = np.array([(r.dt, r.rotational_position_deg, 0) for r in bc_zn_angle])
+states = np.column_stack((bc_zn_angle.dt, bc_zn_angle.rotational_position_deg, zeros))
 create_animation(states, filename="RampRotationalPosition", show_robot=False, custom_pad_x=0.5, custom_pad_y=100, aspect_equal=False, mp4=True)
 
 
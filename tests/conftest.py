@@ -0,0 +1,8 @@
+import os
+import sys
+
+import matplotlib
+
+# Reports are rendered headless, the repository root holds the modules under test
+matplotlib.use("Agg")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
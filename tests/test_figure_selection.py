@@ -0,0 +1,24 @@
+import os
+
+import matplotlib.pyplot as plt
+
+from file_generator import generate_log
+from file_opener import open_file
+
+
+def render(tmp_path, figures):
+    filename = str(tmp_path / "benchmark.bin")
+    generate_log(filename, 14, 200)
+    open_file(filename, display=True, cache=None, stats=False, figures=figures)
+    return tmp_path / "benchmark"
+
+
+def test_selection_matching_nothing_saves_no_figure(tmp_path):
+    directory = render(tmp_path, ["pwm"])
+    assert plt.get_fignums() == []
+    assert not directory.exists()
+
+
+def test_selection_saves_only_its_figure(tmp_path):
+    directory = render(tmp_path, ["trajectory"])
+    assert sorted(os.listdir(directory)) == ["Current_Position.png", "report.json"]
@@ -0,0 +1,31 @@
+import bz2
+import gzip
+import lzma
+
+from data.BenchmarkFile import read_header
+from file_generator import generate_log
+from file_index import index_directory
+
+
+def test_truncated_and_corrupt_logs_are_skipped(tmp_path):
+    filename = str(tmp_path / "valid.bin")
+    generate_log(filename, 14, 100)
+    with open(filename, "rb") as f:
+        read_header(f)
+        header_length = f.tell()
+        f.seek(0)
+        data = f.read()
+    # Cut anywhere in the version, subversion or controller type bytes
+    for length in range(header_length):
+        (tmp_path / f"truncated_{length}.bin").write_bytes(data[:length])
+    compressed = gzip.compress(data)
+    (tmp_path / "cut.bin.gz").write_bytes(compressed[:len(compressed) // 2])
+    (tmp_path / "garbled.bin.gz").write_bytes(compressed[:30] + bytes(len(compressed) - 30))
+    compressed = lzma.compress(data)
+    (tmp_path / "garbled.bin.xz").write_bytes(compressed[:30] + bytes(len(compressed) - 30))
+    compressed = bz2.compress(data)
+    (tmp_path / "garbled.bin.bz2").write_bytes(compressed[:30] + bytes(len(compressed) - 30))
+
+    index = index_directory(str(tmp_path))
+    assert list(index["files"]) == ["valid.bin"]
+    assert index["files"]["valid.bin"]["records"] == 100